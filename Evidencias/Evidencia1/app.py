@@ -1,32 +1,139 @@
 from flask import Flask, request
+from contextlib import contextmanager
+import threading
 
 app = Flask(__name__)
 
-carros = [
+class RWLock:
+    """
+    Lock de lectura/escritura: varias lecturas a la vez o una sola escritura
+
+    Las escrituras tienen prioridad: mientras una espera no entran lecturas
+    nuevas, así un flujo constante de GET no la deja esperando para siempre.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+class CarStore:
+    """
+    Carros en memoria indexados por id, marca y modelo
+
+    Buscar por id y filtrar por marca/modelo no recorre toda la lista: los
+    índices secundarios guardan, por cada valor, los ids en orden de
+    inserción (un dict usado como conjunto ordenado).
+    """
+    INDEXED_FIELDS = ('marca', 'modelo')
+
+    def __init__(self, cars=()):
+        self._lock = RWLock()
+        self._by_id = {}
+        self._indexes = {field: {} for field in self.INDEXED_FIELDS}
+        for car in cars:
+            self.add(car)
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def _unindex(self, car):
+        for field, index in self._indexes.items():
+            ids = index.get(car[field])
+            if ids is not None:
+                ids.pop(car['id'], None)
+                if not ids:
+                    del index[car[field]]
+
+    def add(self, car):
+        """Agregar un carro (si ya existe uno con ese id, lo reemplaza)"""
+        with self._lock.write():
+            previous = self._by_id.pop(car['id'], None)
+            if previous is not None:
+                self._unindex(previous)
+            self._by_id[car['id']] = car
+            for field, index in self._indexes.items():
+                index.setdefault(car[field], {})[car['id']] = None
+        return car
+
+    def get(self, car_id):
+        with self._lock.read():
+            return self._by_id.get(car_id)
+
+    def remove(self, car_id):
+        """Quitar un carro; devuelve False si no existía"""
+        with self._lock.write():
+            car = self._by_id.pop(car_id, None)
+            if car is None:
+                return False
+            self._unindex(car)
+            return True
+
+    def filter(self, **criteria):
+        """Carros cuyos campos indexados coinciden con todos los criterios (None = sin filtro)"""
+        criteria = {field: value for field, value in criteria.items() if value is not None}
+        with self._lock.read():
+            if not criteria:
+                return list(self._by_id.values())
+
+            # Recorrer el conjunto de ids más chico y comprobar el resto
+            candidates = sorted((self._indexes[field].get(value, {}) for field, value in criteria.items()), key=len)
+            smallest, others = candidates[0], candidates[1:]
+            return [self._by_id[car_id] for car_id in smallest if all(car_id in ids for ids in others)]
+
+carros = CarStore([
     {'id': 1, 'marca': 'Toyota', 'modelo': 'Corolla', 'año': 2020},
     {'id': 2, 'marca': 'Honda', 'modelo': 'Civic', 'año': 2019},
     {'id': 3, 'marca': 'Ford', 'modelo': 'Focus', 'año': 2018},
     {'id': 4, 'marca': 'Volkswagen', 'modelo': 'Golf', 'año': 2019},
     {'id': 5, 'marca': 'Chevrolet', 'modelo': 'Cruze', 'año': 2022}
-]
+])
 
 @app.route('/carros/', methods=['GET'])
 def filter_carros():
     marca_query_param = request.args.get("marca")
     modelo_query_param = request.args.get("modelo")
     print(f"marca {marca_query_param}, modelo {modelo_query_param}")
-    ans = carros
-    if marca_query_param is not None:
-        ans = list(filter(lambda x: x ["marca"] == marca_query_param, ans))
-    if modelo_query_param is not None:
-        ans = list(filter(lambda x: x ["modelo"] == modelo_query_param, ans))
+    ans = carros.filter(marca=marca_query_param, modelo=modelo_query_param)
     return ans, 200
 
 @app.route('/carros/<string:carro_id>/', methods=['GET'])
 def get_carro(carro_id):
-    ans = list(filter(lambda x: x ["id"] == int(carro_id), carros))
-    if len(ans) > 0:
-        return ans[0], 200
+    ans = carros.get(int(carro_id))
+    if ans is not None:
+        return ans, 200
     else:
         return {"mensaje": "Carro no existe"}, 404
 
@@ -40,13 +147,12 @@ def post_carro():
             "modelo": body["modelo"],
             "año": body["año"],
     }
-    carros.append(new_carro)
+    carros.add(new_carro)
     return new_carro, 201
 
 @app.route('/carros/<string:carro_id>/', methods=['DELETE'])
 def delete_carro(carro_id):
-    global carros
-    carros = list(filter(lambda x: x["id"] != int(carro_id), carros))
+    carros.remove(int(carro_id))
     return f"se borro el carro de id: {carro_id}", 200
 
 
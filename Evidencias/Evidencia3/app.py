@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, request, jsonify, render_template
 from datetime import datetime, timedelta
 from werkzeug.security import generate_password_hash, check_password_hash 
 from flask_jwt_extended import JWTManager, jwt_required, get_jwt, create_access_token
@@ -332,317 +332,29 @@ def delete_car(car_id):
 
 ############################# HTML-CSS- parte de MONGO ########################################
 
+# Plantillas en templates/ y estilos en static/css/style.css. Se compilan una
+# sola vez al arrancar en lugar de en cada petición con render_template_string
+welcome_template = app.jinja_env.get_template('welcome.html')
+not_found_template = app.jinja_env.get_template('404.html')
+
+# La página 404 no tiene datos dinámicos: se renderiza la primera vez y se reutiliza
+not_found_page = {'html': None}
+
 @app.route('/welcome', methods=['GET'])
 def welcome_page():
     """Ejemplo de HTML con CSS"""
-    html_content = """
-    <!DOCTYPE html>
-    <html lang="es">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Bienvenida</title>
-        <style>
-            * {
-                margin: 0;
-                padding: 0;
-                box-sizing: border-box;
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            }
-            
-            body {
-                min-height: 100vh;
-                display: flex;
-                justify-content: center;
-                align-items: center;
-                background: linear-gradient(135deg, #6a11cb 0%, #2575fc 100%);
-                color: white;
-                overflow: hidden;
-            }
-            
-            .container {
-                max-width: 800px;
-                width: 90%;
-                text-align: center;
-                padding: 40px;
-                background: rgba(255, 255, 255, 0.1);
-                backdrop-filter: blur(10px);
-                border-radius: 20px;
-                box-shadow: 0 15px 35px rgba(0, 0, 0, 0.2);
-                border: 1px solid rgba(255, 255, 255, 0.1);
-                position: relative;
-                z-index: 1;
-            }
-            
-            .logo {
-                width: 120px;
-                height: 120px;
-                margin: 0 auto 30px;
-                background: rgba(255, 255, 255, 0.2);
-                border-radius: 50%;
-                display: flex;
-                justify-content: center;
-                align-items: center;
-                font-size: 50px;
-                box-shadow: 0 8px 20px rgba(0, 0, 0, 0.2);
-            }
-            
-            h1 {
-                font-size: 3.5rem;
-                margin-bottom: 20px;
-                text-shadow: 0 2px 10px rgba(0, 0, 0, 0.2);
-            }
-            
-            p {
-                font-size: 1.2rem;
-                line-height: 1.6;
-                margin-bottom: 30px;
-                opacity: 0.9;
-            }
-            
-            .floating-elements {
-                position: absolute;
-                top: 0;
-                left: 0;
-                width: 100%;
-                height: 100%;
-                overflow: hidden;
-                z-index: 0;
-            }
-            
-            .floating-element {
-                position: absolute;
-                border-radius: 50%;
-                background: rgba(255, 255, 255, 0.1);
-            }
-            
-            .floating-element:nth-child(1) {
-                width: 80px;
-                height: 80px;
-                top: 10%;
-                left: 10%;
-            }
-            
-            .floating-element:nth-child(2) {
-                width: 100px;
-                height: 100px;
-                top: 70%;
-                left: 80%;
-            }
-            
-            .floating-element:nth-child(3) {
-                width: 60px;
-                height: 60px;
-                top: 50%;
-                left: 5%;
-            }
-            
-            .floating-element:nth-child(4) {
-                width: 120px;
-                height: 120px;
-                top: 20%;
-                left: 85%;
-            }
-            
-            .floating-element:nth-child(5) {
-                width: 50px;
-                height: 50px;
-                top: 80%;
-                left: 15%;
-            }
-            
-            .highlight {
-                background: #ff6b6b;
-                color: white;
-                padding: 5px 10px;
-                border-radius: 20px;
-                display: inline-block;
-                margin: 10px 0;
-            }
-            
-            @media (max-width: 768px) {
-                h1 {
-                    font-size: 2.5rem;
-                }
-                
-                p {
-                    font-size: 1rem;
-                }
-            }
-        </style>
-    </head>
-    <body>
-        <div class="floating-elements">
-            <div class="floating-element"></div>
-            <div class="floating-element"></div>
-            <div class="floating-element"></div>
-            <div class="floating-element"></div>
-            <div class="floating-element"></div>
-        </div>
-        
-        <div class="container">
-            <div class="logo">🌟</div>
-            <h1>¡Bienvenido!</h1>
-            <p>Estamos encantados de tenerte aquí. Esta es una página de bienvenida moderna y elegante diseñada para crear una experiencia memorable desde el primer momento.</p>
-            <div class="highlight">{{ current_time }}</div>
-            <p>✨ MongoDB está <strong>{{ db_status }}</strong></p>
-        </div>
-    </body>
-    </html>
-    """
     db_status_value = "conectado" if db is not None else "desconectado"
     current_time_value = datetime.now().strftime("%H:%M:%S")
     
-    return render_template_string(html_content,
-                                db_status = db_status_value,
-                                current_time = current_time_value)
+    return render_template(welcome_template,
+                           db_status = db_status_value,
+                           current_time = current_time_value)
 
 @app.errorhandler(404)
-def page_not_found():
-    html_content_404 = """
-    <!DOCTYPE html>
-    <html lang="es">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Página No Encontrada - Error 404</title>
-        <style>
-            * {
-                margin: 0;
-                padding: 0;
-                box-sizing: border-box;
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            }
-            
-            body {
-                min-height: 100vh;
-                display: flex;
-                justify-content: center;
-                align-items: center;
-                background: linear-gradient(135deg, #6a11cb 0%, #2575fc 100%);
-                color: white;
-                overflow: hidden;
-            }
-            
-            .container {
-                max-width: 800px;
-                width: 90%;
-                text-align: center;
-                padding: 40px;
-                background: rgba(255, 255, 255, 0.1);
-                backdrop-filter: blur(10px);
-                border-radius: 20px;
-                box-shadow: 0 15px 35px rgba(0, 0, 0, 0.2);
-                border: 1px solid rgba(255, 255, 255, 0.1);
-                position: relative;
-                z-index: 1;
-            }
-            
-            .error-code {
-                font-size: 8rem;
-                font-weight: bold;
-                margin-bottom: 20px;
-                text-shadow: 0 5px 15px rgba(0, 0, 0, 0.3);
-                line-height: 1;
-            }
-            
-            h1 {
-                font-size: 2.5rem;
-                margin-bottom: 20px;
-                text-shadow: 0 2px 10px rgba(0, 0, 0, 0.2);
-            }
-            
-            p {
-                font-size: 1.2rem;
-                line-height: 1.6;
-                margin-bottom: 30px;
-                opacity: 0.9;
-            }
-            
-            .floating-elements {
-                position: absolute;
-                top: 0;
-                left: 0;
-                width: 100%;
-                height: 100%;
-                overflow: hidden;
-                z-index: 0;
-            }
-            
-            .floating-element {
-                position: absolute;
-                border-radius: 50%;
-                background: rgba(255, 255, 255, 0.1);
-            }
-            
-            .floating-element:nth-child(1) {
-                width: 80px;
-                height: 80px;
-                top: 10%;
-                left: 10%;
-            }
-            
-            .floating-element:nth-child(2) {
-                width: 100px;
-                height: 100px;
-                top: 70%;
-                left: 80%;
-            }
-            
-            .floating-element:nth-child(3) {
-                width: 60px;
-                height: 60px;
-                top: 50%;
-                left: 5%;
-            }
-            
-            .floating-element:nth-child(4) {
-                width: 120px;
-                height: 120px;
-                top: 20%;
-                left: 85%;
-            }
-            
-            .floating-element:nth-child(5) {
-                width: 50px;
-                height: 50px;
-                top: 80%;
-                left: 15%;
-            }
-            
-            @media (max-width: 768px) {
-                .error-code {
-                    font-size: 6rem;
-                }
-                
-                h1 {
-                    font-size: 2rem;
-                }
-                
-                p {
-                    font-size: 1rem;
-                }
-            }
-        </style>
-    </head>
-    <body>
-        <div class="floating-elements">
-            <div class="floating-element"></div>
-            <div class="floating-element"></div>
-            <div class="floating-element"></div>
-            <div class="floating-element"></div>
-            <div class="floating-element"></div>
-        </div>
-        
-        <div class="container">
-            <div class="error-code">404</div>
-            <h1>Página No Encontrada</h1>
-            <p>Lo sentimos, la página que estás buscando no existe o ha sido movida.</p>
-        </div>
-    </body>
-    </html>
-    """
-    return render_template_string(html_content_404)
+def page_not_found(error):
+    if not_found_page['html'] is None:
+        not_found_page['html'] = render_template(not_found_template)
+    return not_found_page['html'], 404
 
 
 if __name__ == '__main__':
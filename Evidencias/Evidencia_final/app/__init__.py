@@ -1,35 +1,120 @@
+import logging
+import time
 from flask import Flask
 from flask_jwt_extended import JWTManager
 from config import config
-from app.models import init_db, initialize_users, initialize_cars
+from app.compression import init_compression
+from app.hashing import init_password_pool
+from app.health import start_health_probe, get_health
+from app.json_provider import get_json_provider
+from app.logging_setup import init_logging
+from app import metrics
+from app.storage import create_storage
+from app.models import (init_db, init_car_cache, init_collection_versions, init_car_search,
+                        init_token_blocklist, check_db_in_background, is_token_revoked,
+                        get_pool_stats, get_car_cache_stats)
 
 # Instancias globales
 jwt = JWTManager()
+logger = logging.getLogger(__name__)
+
+@jwt.token_in_blocklist_loader
+def check_token_revoked(jwt_header, jwt_payload):
+    """Rechazar los tokens cerrados con /auth/logout (lo usan role_required y admin_required)"""
+    return is_token_revoked(jwt_payload['jti'])
 
 def create_app(config_name='default'):
-    """Factory para crear la aplicación Flask"""
+    """
+    Factory para crear la aplicación Flask
+    
+    No hace E/S bloqueante: la conexión a MongoDB es perezosa, la verificación
+    de conexión e índices corre en segundo plano y los datos iniciales se
+    cargan con `flask --app run seed`.
+    """
+    started = time.perf_counter()
     app = Flask(__name__)
     
     # Cargar configuración
     app.config.from_object(config[config_name])
     
+    # Logging estructurado en segundo plano
+    init_logging(app)
+    
+    # Serialización JSON (ObjectId, datetime y Decimal128 incluidos)
+    app.json = get_json_provider(app.config['JSON_PROVIDER'])(app)
+    
     # Inicializar extensiones
     jwt.init_app(app)
     
-    # Inicializar base de datos
-    init_db(app.config['MONGO_URI'], app.config['DATABASE_NAME'])
+    # Métricas por ruta y de comandos de MongoDB (GET /metrics)
+    event_listeners = []
+    if app.config['METRICS_ENABLED']:
+        metrics.init_metrics(app)
+        event_listeners.append(metrics.command_listener)
+    
+    # Compresión gzip/br/zstd según Accept-Encoding (después de las métricas,
+    # para que la latencia medida incluya la compresión)
+    if app.config['COMPRESSION_ENABLED']:
+        init_compression(app)
     
-    # Inicializar datos por defecto
-    initialize_users()
-    initialize_cars()
+    # Inicializar el almacenamiento elegido en STORAGE_BACKEND (sin conectar todavía)
+    init_db(create_storage(app.config, event_listeners=event_listeners),
+            car_id_block_size=app.config['CAR_ID_BLOCK_SIZE'])
+    if app.config['MONGO_STARTUP_CHECK']:
+        check_db_in_background(create_indexes=app.config['MONGO_CREATE_INDEXES'])
+    if app.config['HEALTH_PROBE_ENABLED']:
+        start_health_probe(app.config['HEALTH_PROBE_INTERVAL'])
+    init_car_cache(app.config['CAR_CACHE_SIZE'], app.config['CAR_CACHE_TTL'])
+    init_collection_versions(app.config['CARS_VERSION_TTL'])
+    init_car_search(app.config['CARS_SEARCH_INDEX_MAX_ENTRIES'])
+    init_token_blocklist(app.config['JWT_BLOCKLIST_CAPACITY'], app.config['JWT_BLOCKLIST_FALSE_POSITIVE_RATE'],
+                         app.config['JWT_BLOCKLIST_VERSION_TTL'])
+    init_password_pool(app.config['AUTH_HASH_WORKERS'],
+                       app.config['AUTH_HASH_MAX_PENDING'],
+                       app.config['AUTH_HASH_TIMEOUT'])
     
     # Registrar blueprints
     from app.routes.auth import auth_bp
     from app.routes.cars import car_bp
     from app.routes.pages import pages_bp
+    from app.routes.health import health_bp
     
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(car_bp, url_prefix='/car')
     app.register_blueprint(pages_bp)
+    app.register_blueprint(health_bp)
     
-    return app
\ No newline at end of file
+    if app.config['METRICS_ENABLED']:
+        from app.routes.metrics import metrics_bp
+        app.register_blueprint(metrics_bp)
+        register_metric_gauges(app)
+    
+    # Comandos de la CLI (flask seed)
+    from app.commands import register_commands
+    register_commands(app)
+    
+    # Tiempo de arranque, para detectar regresiones
+    app.config['STARTUP_TIME_MS'] = (time.perf_counter() - started) * 1000
+    logger.info("create_app listo", extra={'fields': {'config': config_name,
+                                                      'startup_ms': round(app.config['STARTUP_TIME_MS'], 1)}})
+    
+    return app
+
+def register_metric_gauges(app):
+    """Exponer en /metrics las estadísticas del pool, la caché y el arranque"""
+    metrics.register_gauge('mongodb_pool_checked_out_connections', 'Conexiones del pool prestadas',
+                           lambda: get_pool_stats()['checked_out'])
+    metrics.register_gauge('mongodb_pool_open_connections', 'Conexiones del pool abiertas',
+                           lambda: get_pool_stats()['open_connections'])
+    metrics.register_gauge('mongodb_pool_wait_seconds_max', 'Espera máxima por una conexión del pool',
+                           lambda: get_pool_stats()['wait_time_max_ms'] / 1000)
+    metrics.register_gauge('mongodb_up', 'MongoDB respondió al último sondeo (1) o no (0)',
+                           lambda: 1 if get_health()['ok'] else 0)
+    metrics.register_gauge('mongodb_ping_seconds', 'Latencia del último ping a MongoDB',
+                           lambda: (get_health()['latency_ms'] or 0) / 1000)
+    metrics.register_gauge('car_cache_hits_total', 'Aciertos de la caché de carros',
+                           lambda: get_car_cache_stats()['hits'], kind='counter')
+    metrics.register_gauge('car_cache_misses_total', 'Fallos de la caché de carros',
+                           lambda: get_car_cache_stats()['misses'], kind='counter')
+    metrics.register_gauge('app_startup_seconds', 'Duración de create_app',
+                           lambda: app.config['STARTUP_TIME_MS'] / 1000)
@@ -0,0 +1,230 @@
+"""
+Modo de servicio ASGI
+
+Las lecturas de carros y el login (car_bp y auth_bp) se atienden con vistas
+async sobre Motor, de modo que un solo proceso mantiene miles de consultas a
+MongoDB en vuelo. El resto de rutas se delega a la app Flask (WSGI) en un
+hilo, así que las URLs, los hooks de Flask y la validación JWT son los mismos.
+La validación JWT de las vistas async también corre en un hilo
+(asyncio.to_thread): revisar si el token fue revocado puede consultar la base
+con el cliente síncrono.
+Con otro STORAGE_BACKEND (memory, sqlite) todas las rutas van a la app WSGI.
+
+Uso:
+    uvicorn asgi:app
+"""
+import asyncio
+import re
+from asgiref.wsgi import WsgiToAsgi
+from motor.motor_asyncio import AsyncIOMotorClient
+from werkzeug.test import EnvironBuilder
+from flask import jsonify, make_response
+from app import create_app
+from app import models
+from app.hashing import verify_password_async, PasswordVerifierBusy
+from app.routes.auth import read_credentials, auth_error_response, login_response
+from app.routes.cars import parse_listing_args, page_response
+from app.utils import check_role, collection_etag, add_cache_headers, not_modified
+
+DB_UNAVAILABLE = {
+    'error': 'Error de base de datos',
+    'message': 'No se puede conectar a la base de datos. Verifique que MongoDB esté ejecutándose.'
+}
+
+class AsyncMongo:
+    """Cliente Motor creado de forma perezosa dentro del event loop del servidor"""
+
+    def __init__(self, mongo_uri, database_name, options=None):
+        self.mongo_uri = mongo_uri
+        self.database_name = database_name
+        self.options = options or {}
+        self.client = None
+        self.db = None
+
+    def get_db(self):
+        if self.db is None:
+            # Mismas opciones de pool que el cliente síncrono (storage.mongo_client_options)
+            self.client = AsyncIOMotorClient(self.mongo_uri, **self.options)
+            self.db = self.client[self.database_name]
+        return self.db
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+        self.client = None
+        self.db = None
+
+# ========== VISTAS ASYNC ==========
+
+async def cars_etag(mongo):
+    """Igual que collection_etag('cars', models.get_collection_version('cars')), sin bloquear"""
+    version = models.collection_versions.get('cars')
+    if version is None:
+        counter = await mongo.get_db().counters.find_one({'_id': models.version_counter_id('cars')})
+        version = models.remember_collection_version('cars', counter['seq'] if counter else 0)
+    return collection_etag('cars', version)
+
+async def get_car(mongo, car_id):
+    """GET /car/<car_id>/ (misma respuesta que cars.get_car)"""
+    error = await asyncio.to_thread(check_role)
+    if error:
+        return error
+
+    try:
+        etag = await cars_etag(mongo)
+        unchanged = not_modified(etag)
+        if unchanged:
+            return unchanged
+        
+        car_id = int(car_id)
+        car = models.car_cache.get(car_id)
+        if car is None:
+            cars = await mongo.get_db().cars.aggregate([
+                {'$match': {'car_id': car_id}},
+                {'$limit': 1},
+                {'$project': models.CAR_PROJECTION}
+            ]).to_list(length=1)
+            car = cars[0] if cars else None
+            if car is not None:
+                models.car_cache.set(car_id, car)
+        if car is None:
+            return {"mensaje": "Mesa no existe"}, 404
+        return add_cache_headers(make_response(dict(car), 200), etag)
+    except Exception as e:
+        return jsonify(DB_UNAVAILABLE), 503
+
+async def get_all_cars(mongo):
+    """GET /car paginado (misma respuesta que cars.get_all_cars sin stream)"""
+    error = await asyncio.to_thread(check_role)
+    if error:
+        return error
+
+    params, error_response = parse_listing_args()
+    if error_response:
+        return error_response
+
+    try:
+        etag = await cars_etag(mongo)
+        unchanged = not_modified(etag)
+        if unchanged:
+            return unchanged
+        
+        query = params['query']
+        cars = await mongo.get_db().cars.aggregate(query.pipeline()).to_list(length=query.limit_value)
+        return page_response(cars, query, etag)
+    except Exception as e:
+        return jsonify(DB_UNAVAILABLE), 503
+
+async def login(mongo):
+    """POST /auth/login (misma respuesta que auth.login)"""
+    username, password, error_response = read_credentials()
+    if error_response:
+        return error_response
+
+    try:
+        user = await mongo.get_db().users.find_one({"username": username})
+        if not user or not await verify_password_async(user['password_hash'], password):
+            return auth_error_response(models.AUTH_INVALID_CREDENTIALS, 401)
+    except PasswordVerifierBusy:
+        return auth_error_response(models.AUTH_BUSY, 503)
+    except Exception as e:
+        return auth_error_response(models.AUTH_DB_UNAVAILABLE, 503)
+
+    return login_response(user)
+
+# (método, patrón de la ruta, vista); lo que no coincide va a la app WSGI
+ASYNC_ROUTES = [
+    ('GET', re.compile(r'^/car/(?P<car_id>[^/]+)/$'), get_car),
+    ('GET', re.compile(r'^/car$'), get_all_cars),
+    ('POST', re.compile(r'^/auth/login$'), login),
+]
+
+class AsyncApp:
+    """Aplicación ASGI: vistas async propias y la app Flask como respaldo"""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi_app = WsgiToAsgi(flask_app)
+        self.mongo = None
+        if models.storage.name == 'mongo':
+            self.mongo = AsyncMongo(models.storage.uri, models.storage.database_name, models.storage.options)
+
+    def match(self, scope):
+        if self.mongo is None:
+            return None, None
+        for method, pattern, view in ASYNC_ROUTES:
+            if scope['method'] != method:
+                continue
+            found = pattern.match(scope['path'])
+            if found:
+                return view, found.groupdict()
+        return None, None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        view, kwargs = (None, None)
+        if scope['type'] == 'http':
+            view, kwargs = self.match(scope)
+            # El streaming de GET /car sigue en la versión WSGI
+            if view is get_all_cars and b'stream=' in scope.get('query_string', b''):
+                view = None
+
+        if view is None:
+            return await self.wsgi_app(scope, receive, send)
+
+        body = await read_body(receive)
+        response = await self.dispatch(scope, body, view, kwargs)
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in response.headers.to_wsgi_list()
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': b''.join(response.iter_encoded())})
+
+    async def dispatch(self, scope, body, view, kwargs):
+        """Ejecutar la vista dentro de un contexto de petición de Flask"""
+        app = self.flask_app
+        environ = EnvironBuilder(
+            path=scope['path'],
+            method=scope['method'],
+            query_string=scope.get('query_string', b'').decode('latin-1'),
+            headers=[(name.decode('latin-1'), value.decode('latin-1')) for name, value in scope['headers']],
+            data=body,
+        ).get_environ()
+
+        with app.request_context(environ):
+            try:
+                rv = app.preprocess_request()
+                if rv is None:
+                    rv = await view(self.mongo, **kwargs)
+            except Exception as e:
+                rv = app.handle_user_exception(e)
+            return app.finalize_request(rv)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.mongo is not None:
+                    self.mongo.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+def create_asgi_app(config_name='default'):
+    """Factory de la variante ASGI (mismas rutas y JWT que create_app)"""
+    return AsyncApp(create_app(config_name))
@@ -0,0 +1,132 @@
+"""
+Lista de tokens revocados (POST /auth/logout) con un filtro de Bloom delante
+
+Los jti revocados se guardan en el almacenamiento hasta su exp. Cada worker
+tiene además un filtro de Bloom con esos jti: si el filtro dice que un jti
+no está (el caso de casi todas las peticiones) no hace falta consultar la
+base de datos; si dice que puede estar, se confirma en la base.
+
+Cada revocación guarda como seq la versión de la colección de revocados
+que dejó su logout. Cuando la versión cambia, el filtro solo agrega los jti
+con seq mayor que la suya, así que un logout atendido por otro worker se ve
+en este a más tardar en JWT_BLOCKLIST_VERSION_TTL segundos sin releer toda la
+colección. Se rearma completo si falta alguna seq del rango (p. ej. una
+revocación que ya expiró) o si el filtro se llenó.
+"""
+import hashlib
+import math
+import threading
+
+class BloomFilter:
+    """Conjunto probabilístico: sin falsos negativos y con false_positive_rate de falsos positivos"""
+
+    def __init__(self, capacity, false_positive_rate):
+        capacity = max(1, int(capacity))
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # Doble hashing: las hash_count posiciones salen de dos hashes de 64 bits
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+class TokenBlocklist:
+    """Filtro de Bloom de los jti revocados de un proceso, con la versión de la que salió"""
+
+    def __init__(self, capacity=100000, false_positive_rate=0.001):
+        self.capacity = capacity
+        self.false_positive_rate = false_positive_rate
+        self.version = None
+        self.count = 0
+        self.filter = BloomFilter(capacity, false_positive_rate)
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+
+    def rebuild(self, jtis, version):
+        """Reemplazar el filtro con los jti revocados vigentes"""
+        jtis = list(jtis)
+        bloom = BloomFilter(max(self.capacity, 2 * len(jtis)), self.false_positive_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        with self._lock:
+            self.filter = bloom
+            self.count = len(jtis)
+            self.version = version
+
+    def extend(self, revocations, version):
+        """
+        Agregar las revocaciones posteriores a self.version y pasar a version
+
+        Args:
+            revocations: lista de (jti, seq); seq es None si el logout todavía
+                no la asignó
+            version: versión actual de la colección de revocados
+
+        Returns:
+            bool: False si falta alguna seq entre self.version y version o si
+                el filtro ya no tiene capacidad (hay que rearmarlo)
+        """
+        with self._lock:
+            found = sum(1 for _, seq in revocations if seq is None or self.version < seq <= version)
+            if found < version - self.version or self.count + len(revocations) > self.filter.capacity:
+                return False
+            for jti, _ in revocations:
+                self.filter.add(jti)
+            self.count += len(revocations)
+            self.version = version
+            return True
+
+    def refresh(self, version, load_since, load_all):
+        """
+        Poner el filtro en version si está en otra
+
+        load_since(seq) devuelve los (jti, seq) revocados después de seq y
+        load_all() todos los jti vigentes (solo para rearmarlo). Un solo hilo
+        lo actualiza; mientras tanto los demás siguen usando el filtro
+        anterior si ya había uno (si no, esperan).
+        """
+        if self.version == version:
+            return
+        if not self._rebuild_lock.acquire(blocking=self.version is None):
+            return
+        try:
+            if self.version is None or self.version > version:
+                self.rebuild(load_all(), version)
+            elif self.version != version and not self.extend(list(load_since(self.version)), version):
+                self.rebuild(load_all(), version)
+        finally:
+            self._rebuild_lock.release()
+
+    def add(self, jti, version):
+        """
+        Agregar un jti revocado por este proceso
+
+        Si el filtro estaba en la versión anterior a la del logout ya tiene
+        todos los demás revocados y pasa a esa versión sin rearmarse.
+        """
+        with self._lock:
+            self.filter.add(jti)
+            self.count += 1
+            if self.version is not None and self.version == version - 1:
+                self.version = version
+
+    def might_contain(self, jti):
+        # Sin lock: rebuild reemplaza el filtro completo de una vez y extend
+        # solo prende bits de jti nuevos
+        return jti in self.filter
+
+    def after_fork(self):
+        # Los locks pudieron quedar tomados por hilos del padre
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
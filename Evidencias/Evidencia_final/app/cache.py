@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """
+    Caché en memoria acotada, con desalojo LRU y expiración por TTL
+
+    Es segura entre hilos y lleva contadores de aciertos/fallos. Con
+    max_size=0 queda deshabilitada (get siempre falla y set no guarda nada).
+    """
+
+    def __init__(self, max_size=0, ttl=0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expira_en, valor)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Devolver el valor guardado o None si no está o ya expiró"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Guardar un valor, desalojando el menos usado si se llena"""
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Eliminar una entrada (tras escribir en la base de datos)"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """Contadores de uso de la caché"""
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
@@ -0,0 +1,55 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from app.models import (check_db, ensure_indexes, migrate_legacy_cars, initialize_users, initialize_cars,
+                        sync_car_id_counter, sync_car_stats, rebuild_car_stats, get_car_stats, get_car_count)
+
+def register_commands(app):
+    """Registrar los comandos de la CLI de Flask (flask --app run <comando>)"""
+    app.cli.add_command(seed_command)
+    app.cli.add_command(stats_group)
+
+@click.command('seed')
+@with_appcontext
+def seed_command():
+    """Migrar carros antiguos y crear índices, usuarios y carros iniciales si la base está vacía"""
+    if not check_db(create_indexes=False):
+        raise click.ClickException('No se puede conectar a la base de datos')
+    
+    # Antes de los índices: el único de car_id falla con carros que solo tienen 'id'
+    migrated = migrate_legacy_cars()
+    if migrated:
+        click.echo(f"✅ {migrated} carros migrados de 'id' a 'car_id'")
+    missing = ensure_indexes(create=True)
+    if missing:
+        click.echo(f"⚠️  Índices faltantes: {', '.join(missing)}")
+    
+    if initialize_users():
+        click.echo("✅ Usuarios iniciales creados")
+    if initialize_cars():
+        click.echo("✅ carros iniciales creados")
+    sync_car_id_counter()
+    if sync_car_stats():
+        click.echo("✅ Resumen de inventario reconstruido")
+    click.echo(f"✅ Base de datos {current_app.config['DATABASE_NAME']} lista")
+
+@click.group('stats')
+def stats_group():
+    """Resumen de inventario de GET /car/stats"""
+
+@stats_group.command('rebuild')
+@with_appcontext
+def rebuild_stats_command():
+    """
+    Recalcular el resumen completo a partir de los carros
+    
+    Pausar las escrituras de carros mientras corre: en MongoDB un alta
+    durante la reconstrucción puede perderse del resumen.
+    """
+    if not check_db(create_indexes=False):
+        raise click.ClickException('No se puede conectar a la base de datos')
+    
+    groups = rebuild_car_stats()
+    if get_car_stats()['total'] != get_car_count():
+        raise click.ClickException('El resumen no coincide con los carros; pause las escrituras y repita')
+    click.echo(f"✅ Resumen de inventario reconstruido: {groups} grupos")
@@ -0,0 +1,141 @@
+"""
+Compresión de las respuestas según Accept-Encoding
+
+Se comprimen con gzip, brotli (br) o zstd las respuestas de texto/JSON que
+superan COMPRESSION_MIN_SIZE; las transmitidas por partes (stream) se
+comprimen a medida que se generan. brotli y zstandard son opcionales: si no
+están instalados solo se ofrece gzip.
+"""
+import logging
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard es opcional
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'application/javascript', 'text/')
+
+# En respuestas transmitidas, vaciar el compresor cada tantos bytes de entrada
+STREAM_FLUSH_BYTES = 64 * 1024
+
+# Cada compresor se expone como (compress, flush, finish)
+def _gzip(level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = formato gzip
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+def _brotli(level):
+    compressor = brotli.Compressor(quality=level)
+    return compressor.process, compressor.flush, compressor.finish
+
+def _zstd(level):
+    compressor = zstandard.ZstdCompressor(level=level).compressobj()
+    return (compressor.compress,
+            lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+            compressor.flush)
+
+ENCODERS = {'gzip': _gzip}
+if brotli is not None:
+    ENCODERS['br'] = _brotli
+if zstandard is not None:
+    ENCODERS['zstd'] = _zstd
+
+DEFAULT_LEVELS = {'gzip': 6, 'br': 4, 'zstd': 3}
+
+_settings = {'algorithms': ['gzip'], 'levels': dict(DEFAULT_LEVELS), 'min_size': 1024}
+
+def parse_levels(value):
+    """'gzip=6,br=4' -> {'gzip': 6, 'br': 4}"""
+    levels = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        name, level = item.split('=')
+        levels[name.strip()] = int(level)
+    return levels
+
+def choose_encoding():
+    """Codificación aceptada por el cliente con mayor q (en empate, la preferida por el servidor)"""
+    accepted = request.accept_encodings
+    best, best_quality = None, 0
+    for name in _settings['algorithms']:
+        quality = accepted[name]
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+def _compressible(response):
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return False
+    return (response.mimetype or '').startswith(COMPRESSIBLE_MIMETYPES)
+
+def _stream(chunks, encoding):
+    compress, flush, finish = ENCODERS[encoding](_settings['levels'][encoding])
+    pending = 0
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        pending += len(chunk)
+        data = compress(chunk)
+        if pending >= STREAM_FLUSH_BYTES:
+            data += flush()
+            pending = 0
+        if data:
+            yield data
+    yield finish()
+
+def compress_response(response):
+    """after_request: comprimir el cuerpo si el cliente lo acepta y vale la pena"""
+    if not _compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+
+    if not response.is_streamed:
+        length = response.calculate_content_length()
+        if length is not None and length < _settings['min_size']:
+            return response
+
+    encoding = choose_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        compress, flush, finish = ENCODERS[encoding](_settings['levels'][encoding])
+        response.set_data(compress(response.get_data()) + finish())
+    response.headers['Content-Encoding'] = encoding
+
+    # Un ETag fuerte identifica bytes exactos: cada codificación lleva el suyo
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(encoded_etag(etag, encoding))
+    return response
+
+def encoded_etag(etag, encoding):
+    return f'{etag}-{encoding}'
+
+def init_compression(app):
+    """Leer COMPRESSION_* y registrar la compresión de respuestas en la app"""
+    algorithms = [name.strip() for name in app.config['COMPRESSION_ALGORITHMS'].split(',') if name.strip()]
+    unknown = [name for name in algorithms if name not in DEFAULT_LEVELS]
+    if unknown:
+        raise ValueError(f"COMPRESSION_ALGORITHMS no reconocidos: {', '.join(unknown)}")
+    missing = [name for name in algorithms if name not in ENCODERS]
+    if missing:
+        logger.warning("Compresión no disponible (falta brotli/zstandard)",
+                       extra={'fields': {'algorithms': missing}})
+
+    _settings['algorithms'] = [name for name in algorithms if name in ENCODERS]
+    _settings['levels'] = {**DEFAULT_LEVELS, **parse_levels(app.config['COMPRESSION_LEVELS'])}
+    _settings['min_size'] = app.config['COMPRESSION_MIN_SIZE']
+    app.after_request(compress_response)
@@ -0,0 +1,103 @@
+"""
+Exportación del catálogo de carros en NDJSON, CSV o Parquet
+
+Los carros se leen del cursor por lotes de CARS_EXPORT_BATCH_SIZE y cada lote
+se serializa y se envía antes de pedir el siguiente, así que la memoria usada
+no depende del tamaño del catálogo. pyarrow es opcional: si no está instalado
+no se ofrece Parquet.
+"""
+import csv
+import io
+from itertools import islice
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pyarrow es opcional
+    pyarrow = None
+
+EXPORT_COLUMNS = ('car_id', 'marca', 'modelo', 'año')
+
+def read_batches(cursor, batch_size):
+    """Recorrer el cursor en listas de a lo más batch_size carros"""
+    while True:
+        batch = list(islice(cursor, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def export_ndjson(batches, dumps):
+    for batch in batches:
+        yield ''.join(dumps(car) + '\n' for car in batch)
+
+def export_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in batches:
+        writer.writerows([car.get(column) for column in EXPORT_COLUMNS] for car in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Solo queda algo si no hubo ningún lote (el encabezado)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+class ChunkSink(io.RawIOBase):
+    """Archivo de solo escritura que acumula lo escrito hasta el siguiente drain()"""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def export_parquet(batches):
+    """Un row group por lote; el pie del archivo sale al final"""
+    schema = pyarrow.schema([
+        ('car_id', pyarrow.int64()),
+        ('marca', pyarrow.string()),
+        ('modelo', pyarrow.string()),
+        ('año', pyarrow.int64()),
+    ])
+    sink = ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    try:
+        for batch in batches:
+            writer.write_table(pyarrow.Table.from_pylist(batch, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+# formato -> (mimetype, extensión)
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+}
+if pyarrow is not None:
+    EXPORT_FORMATS['parquet'] = ('application/vnd.apache.parquet', 'parquet')
+
+def export_cars(stream_format, batches, dumps):
+    """Generador del cuerpo de la exportación en el formato pedido"""
+    if stream_format == 'ndjson':
+        return export_ndjson(batches, dumps)
+    if stream_format == 'csv':
+        return export_csv(batches)
+    return export_parquet(batches)
@@ -0,0 +1,166 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import check_password_hash
+
+class PasswordVerifierBusy(Exception):
+    """La cola de verificación de contraseñas está llena, no respondió a tiempo o perdió un proceso"""
+
+# Configuración del pool (se ajusta con init_password_pool)
+_settings = {'workers': 0, 'max_pending': 0, 'timeout': None}
+_slots = threading.BoundedSemaphore(1)
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+# True mientras este proceso crea los procesos del pool: cada proceso del pool
+# lo hereda en True y así sabe que es uno de ellos (ver is_pool_worker)
+_pool_fork = {'active': False}
+
+def is_pool_worker():
+    """
+    True en los procesos del pool de contraseñas
+
+    Los handlers de os.register_at_fork que abren conexiones o inician hilos
+    (MongoDB, sondeo de salud, logs) deben no hacer nada en ellos: el pool
+    solo ejecuta check_password_hash.
+    """
+    return _pool_fork['active']
+
+def init_password_pool(workers, max_pending, timeout):
+    """
+    Configurar la verificación de contraseñas fuera del hilo de la petición
+
+    Args:
+        workers: procesos del pool (0 = verificar en línea, sin pool)
+        max_pending: verificaciones en curso o en cola antes de rechazar
+        timeout: segundos máximos de espera por una verificación
+    """
+    global _slots
+    _settings['workers'] = max(0, int(workers))
+    _settings['max_pending'] = max(1, int(max_pending))
+    _settings['timeout'] = timeout
+    _slots = threading.BoundedSemaphore(_settings['max_pending'])
+    _shutdown_executor()
+
+def _shutdown_executor():
+    global _executor, _executor_pid
+    if _executor is not None and _executor_pid == os.getpid():
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+    _executor_pid = None
+
+def _get_executor():
+    """
+    Crear el pool de forma perezosa y por proceso (no se hereda tras un fork)
+
+    Se usa 'fork' para que los procesos del pool no vuelvan a importar el
+    módulo principal (run.py crearía la app entera en cada uno). Los procesos
+    se crean todos aquí, con _pool_fork activo, para que los handlers de fork
+    de la app (is_pool_worker) no reconecten MongoDB ni inicien hilos en ellos.
+    """
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            executor = ProcessPoolExecutor(
+                max_workers=_settings['workers'],
+                mp_context=multiprocessing.get_context('fork')
+            )
+            _pool_fork['active'] = True
+            try:
+                # Con 'fork' el pool crea todos sus procesos en el primer submit
+                executor.submit(int)
+            finally:
+                _pool_fork['active'] = False
+            _executor, _executor_pid = executor, os.getpid()
+        return _executor
+
+def _discard_executor(executor):
+    """
+    Descartar un pool roto (un proceso murió, p. ej. por OOM)
+
+    Un ProcessPoolExecutor roto rechaza todo lo que se le envía: la siguiente
+    verificación crea uno nuevo en _get_executor.
+    """
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+            _executor_pid = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def _reset_after_fork():
+    global _executor, _executor_pid, _executor_lock, _slots
+    _executor = None
+    _executor_pid = None
+    _executor_lock = threading.Lock()
+    _slots = threading.BoundedSemaphore(max(1, _settings['max_pending']))
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+def _submit(password_hash, password):
+    """
+    Encolar una verificación en el pool; el cupo se libera cuando termina
+
+    Returns:
+        tuple: (executor, future)
+
+    Raises:
+        PasswordVerifierBusy: si ya hay max_pending verificaciones en curso
+            o si el pool está roto
+    """
+    slots = _slots
+    if not slots.acquire(blocking=False):
+        raise PasswordVerifierBusy()
+    executor = None
+    try:
+        executor = _get_executor()
+        future = executor.submit(check_password_hash, password_hash, password)
+    except BrokenProcessPool:
+        slots.release()
+        if executor is not None:
+            _discard_executor(executor)
+        raise PasswordVerifierBusy()
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return executor, future
+
+def verify_password(password_hash, password):
+    """
+    Verificar una contraseña en el pool de procesos (libre del GIL)
+
+    Raises:
+        PasswordVerifierBusy: si ya hay max_pending verificaciones en curso,
+            si la verificación supera el timeout o si murió un proceso del pool
+    """
+    if _settings['workers'] == 0:
+        return check_password_hash(password_hash, password)
+
+    executor, future = _submit(password_hash, password)
+    try:
+        return future.result(timeout=_settings['timeout'])
+    except TimeoutError:
+        future.cancel()
+        raise PasswordVerifierBusy()
+    except BrokenProcessPool:
+        _discard_executor(executor)
+        raise PasswordVerifierBusy()
+
+async def verify_password_async(password_hash, password):
+    """Igual que verify_password, pero esperando sin bloquear el event loop"""
+    if _settings['workers'] == 0:
+        return await asyncio.to_thread(check_password_hash, password_hash, password)
+
+    executor, future = _submit(password_hash, password)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), _settings['timeout'])
+    except asyncio.TimeoutError:
+        future.cancel()
+        raise PasswordVerifierBusy()
+    except BrokenProcessPool:
+        _discard_executor(executor)
+        raise PasswordVerifierBusy()
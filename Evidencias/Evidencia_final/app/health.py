@@ -0,0 +1,83 @@
+"""
+Sondeo de la base de datos en segundo plano
+
+Un hilo hace ping al almacenamiento (MongoDB, SQLite...) cada
+HEALTH_PROBE_INTERVAL segundos y guarda el resultado con su latencia.
+/readyz, /welcome y get_db_status leen ese resultado, así que ninguna
+petición espera a la base de datos para saber su estado.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from app import models
+from app.hashing import is_pool_worker
+
+# Un resultado más viejo que STALE_FACTOR intervalos ya no cuenta (el hilo se atascó)
+STALE_FACTOR = 3
+
+_lock = threading.Lock()
+_status = {'ok': None, 'latency_ms': None, 'checked_at': None, 'error': None, 'updated': None}
+_probe = {'thread': None, 'stop': None, 'interval': 5.0}
+
+def probe_once():
+    """Hacer ping al almacenamiento y guardar el resultado"""
+    started = time.perf_counter()
+    try:
+        models.storage.ping()
+        ok, error = True, None
+    except Exception as e:
+        ok, error = False, str(e)
+    latency_ms = (time.perf_counter() - started) * 1000
+
+    with _lock:
+        _status.update(ok=ok, latency_ms=round(latency_ms, 3), error=error,
+                       checked_at=datetime.now(timezone.utc).isoformat(),
+                       updated=time.monotonic())
+    # Mismo indicador que deja check_db al arrancar
+    models.db_reachable = ok
+    return ok
+
+def _run(stop, interval):
+    while True:
+        probe_once()
+        if stop.wait(interval):
+            return
+
+def start_health_probe(interval):
+    """Iniciar (o reiniciar) el hilo de sondeo de este proceso"""
+    stop_health_probe()
+    stop = threading.Event()
+    thread = threading.Thread(target=_run, args=(stop, interval), name='db-health-probe', daemon=True)
+    _probe.update(thread=thread, stop=stop, interval=interval)
+    thread.start()
+    return thread
+
+def stop_health_probe():
+    if _probe['stop'] is not None:
+        _probe['stop'].set()
+    _probe.update(thread=None, stop=None)
+
+def _restart_after_fork():
+    # El hilo no sobrevive al fork: cada proceso hijo sondea por su cuenta
+    # (salvo los del pool de contraseñas, que no atienden peticiones)
+    if _probe['thread'] is not None and not is_pool_worker():
+        _probe.update(thread=None, stop=None)
+        with _lock:
+            _status.update(ok=None, latency_ms=None, checked_at=None, error=None, updated=None)
+        start_health_probe(_probe['interval'])
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+
+def get_health():
+    """Último resultado del sondeo (ok es None si todavía no hay ninguno)"""
+    with _lock:
+        status = dict(_status)
+    updated = status.pop('updated')
+    status['stale'] = updated is None or time.monotonic() - updated > _probe['interval'] * STALE_FACTOR
+    return status
+
+def is_ready():
+    """La base de datos respondió en el último sondeo y el resultado es reciente"""
+    status = get_health()
+    return bool(status['ok']) and not status['stale']
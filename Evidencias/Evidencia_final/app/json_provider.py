@@ -0,0 +1,72 @@
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from bson import ObjectId, Decimal128
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+def mongo_default(value):
+    """Serializar los tipos de BSON/Python que el JSON estándar no conoce"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal128):
+        return str(value.to_decimal())
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """Proveedor JSON de Flask que además entiende ObjectId, datetime y Decimal128"""
+
+    @staticmethod
+    def default(value):
+        return mongo_default(value)
+
+class OrjsonProvider(JSONProvider):
+    """
+    Proveedor JSON respaldado por orjson (varias veces más rápido que json)
+
+    No ordena las claves por defecto y responde siempre en formato compacto.
+    """
+    sort_keys = False
+    mimetype = "application/json"
+
+    def _options(self):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=mongo_default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=mongo_default, option=self._options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+JSON_PROVIDERS = {
+    'default': MongoJSONProvider,
+    'orjson': OrjsonProvider,
+}
+
+def get_json_provider(name):
+    """Clase de proveedor JSON según la configuración (si falta orjson se usa la estándar)"""
+    if name not in JSON_PROVIDERS:
+        raise ValueError(f"JSON_PROVIDER debe ser uno de: {', '.join(JSON_PROVIDERS)}")
+    if name == 'orjson' and orjson is None:
+        logger.warning("orjson no está instalado; se usa el proveedor JSON estándar",
+                       extra={'fields': {'json_provider': name}})
+        return MongoJSONProvider
+    return JSON_PROVIDERS[name]
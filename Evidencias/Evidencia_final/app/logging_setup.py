@@ -0,0 +1,123 @@
+"""
+Logging estructurado sin bloquear las peticiones
+
+Los módulos de la app usan logging.getLogger(__name__) y pasan datos con
+extra={'fields': {...}}. En el hilo de la petición solo se aplica el
+muestreo y se encola el registro (QueueHandler); un QueueListener en otro
+hilo oculta los campos sensibles, da formato JSON y escribe en stdout.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from app.hashing import is_pool_worker
+
+REDACTED = '[REDACTED]'
+
+class SamplingFilter(logging.Filter):
+    """Dejar pasar solo una fracción de los registros de cada nivel"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates  # nombre del nivel -> fracción entre 0 y 1
+
+    def filter(self, record):
+        rate = self.rates.get(record.levelname, 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+class RedactingFilter(logging.Filter):
+    """Reemplazar los campos sensibles (password, tokens...) antes de escribir"""
+
+    def __init__(self, field_names):
+        super().__init__()
+        self.field_names = {name.lower() for name in field_names}
+
+    def redact(self, value):
+        if isinstance(value, dict):
+            return {
+                key: REDACTED if str(key).lower() in self.field_names else self.redact(item)
+                for key, item in value.items()
+            }
+        if isinstance(value, (list, tuple)):
+            return [self.redact(item) for item in value]
+        return value
+
+    def filter(self, record):
+        fields = getattr(record, 'fields', None)
+        if fields:
+            record.fields = self.redact(fields)
+        return True
+
+class JSONFormatter(logging.Formatter):
+    """Una línea JSON por registro"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def parse_sample_rates(value):
+    """'DEBUG=0.1,INFO=0.5' -> {'DEBUG': 0.1, 'INFO': 0.5}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        level, rate = item.split('=')
+        rates[level.strip().upper()] = float(rate)
+    return rates
+
+_listener = {'listener': None, 'args': None}
+
+def _start_listener(log_queue, redact_fields):
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JSONFormatter())
+    handler.addFilter(RedactingFilter(redact_fields))
+    listener = QueueListener(log_queue, handler, respect_handler_level=False)
+    listener.start()
+    _listener['listener'] = listener
+    _listener['args'] = (log_queue, redact_fields)
+
+def _stop_listener():
+    listener = _listener['listener']
+    if listener is not None:
+        listener.stop()
+    _listener['listener'] = None
+
+def _restart_after_fork():
+    # El hilo del listener no sobrevive al fork: cada proceso hijo inicia el suyo
+    # (salvo los del pool de contraseñas, que no escriben logs)
+    if _listener['listener'] is not None and not is_pool_worker():
+        _listener['listener'] = None
+        _start_listener(*_listener['args'])
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+atexit.register(_stop_listener)
+
+def init_logging(app):
+    """Configurar el logger 'app' con la cola, el muestreo y la redacción"""
+    _stop_listener()
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(parse_sample_rates(app.config['LOG_SAMPLE_RATES'])))
+
+    logger = logging.getLogger('app')
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(queue_handler)
+    logger.setLevel(app.config['LOG_LEVEL'])
+    logger.propagate = False
+
+    _start_listener(log_queue, [name.strip() for name in app.config['LOG_REDACT_FIELDS'].split(',')])
@@ -0,0 +1,162 @@
+"""
+Métricas de la aplicación en formato de texto de Prometheus
+
+Se registran la latencia por ruta (histograma), las respuestas por código,
+las peticiones en curso y la duración de los comandos de MongoDB (a través
+de un CommandListener de pymongo). Se exponen en GET /metrics.
+"""
+import bisect
+import threading
+import time
+from flask import g, request
+from pymongo import monitoring
+
+# Límites (segundos) de los histogramas de latencia
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+class Histogram:
+    """Histograma acumulativo por combinación de etiquetas"""
+
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # valores de etiquetas -> [conteos por bucket, suma, total]
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for label_values, (counts, total, count) in sorted(series.items()):
+            labels = list(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_format_labels(labels + [("le", bound)])} {cumulative}')
+            lines.append(f'{self.name}_bucket{_format_labels(labels + [("le", "+Inf")])} {count}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {count}')
+        return lines
+
+class Counter:
+    """Contador (o gauge, si se usa dec) por combinación de etiquetas"""
+
+    def __init__(self, name, help_text, label_names, kind='counter'):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.kind = kind
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values=(), amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def dec(self, label_values=(), amount=1):
+        self.inc(label_values, -amount)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            lines.append(f'{self.name}{_format_labels(list(zip(self.label_names, label_values)))} {value}')
+        return lines
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Latencia de las peticiones HTTP por ruta',
+    ('blueprint', 'endpoint', 'method'))
+REQUESTS_TOTAL = Counter(
+    'http_requests_total', 'Respuestas HTTP por ruta y código',
+    ('blueprint', 'endpoint', 'method', 'status'))
+REQUESTS_IN_FLIGHT = Counter(
+    'http_requests_in_flight', 'Peticiones HTTP en curso', (), kind='gauge')
+MONGO_COMMAND_LATENCY = Histogram(
+    'mongodb_command_duration_seconds', 'Duración de los comandos de MongoDB',
+    ('command',))
+MONGO_COMMAND_FAILURES = Counter(
+    'mongodb_command_failures_total', 'Comandos de MongoDB fallidos', ('command',))
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Registrar la duración de cada comando que pymongo envía al servidor"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_LATENCY.observe((event.command_name,), event.duration_micros / 1e6)
+
+    def failed(self, event):
+        MONGO_COMMAND_LATENCY.observe((event.command_name,), event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.inc((event.command_name,))
+
+command_listener = CommandMetricsListener()
+
+# Métricas que se leen en el momento de exponerlas: nombre -> (ayuda, función, tipo)
+_gauges = {}
+
+def register_gauge(name, help_text, read, kind='gauge'):
+    """Exponer un valor calculado al momento (p. ej. estadísticas del pool)"""
+    _gauges[name] = (help_text, read, kind)
+
+def _route_labels():
+    rule = request.url_rule
+    return (request.blueprint or '', rule.rule if rule else 'unmatched', request.method)
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    REQUESTS_IN_FLIGHT.inc()
+
+def _after_request(response):
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        labels = _route_labels()
+        REQUEST_LATENCY.observe(labels, time.perf_counter() - started)
+        REQUESTS_TOTAL.inc(labels + (str(response.status_code),))
+        REQUESTS_IN_FLIGHT.dec()
+    return response
+
+def _teardown_request(exception):
+    # Si after_request no llegó a ejecutarse, no dejar la petición "en curso"
+    if g.pop('metrics_started', None) is not None:
+        REQUESTS_IN_FLIGHT.dec()
+
+def init_metrics(app):
+    """Registrar los hooks de medición en la app"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+
+def render():
+    """Todas las métricas en formato de texto de Prometheus"""
+    lines = []
+    for metric in (REQUEST_LATENCY, REQUESTS_TOTAL, REQUESTS_IN_FLIGHT,
+                   MONGO_COMMAND_LATENCY, MONGO_COMMAND_FAILURES):
+        lines.extend(metric.render())
+    for name, (help_text, read, kind) in sorted(_gauges.items()):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.append(f'{name} {read()}')
+    return '\n'.join(lines) + '\n'
@@ -1,48 +1,234 @@
+import logging
+import os
+import re
+import threading
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
-from pymongo import MongoClient
-from bson import ObjectId
+from werkzeug.security import generate_password_hash
+from pymongo import ASCENDING, DESCENDING
+from app.cache import TTLCache
+from app.hashing import verify_password, PasswordVerifierBusy, is_pool_worker
+from app.mongo_stats import PoolStatsListener
+from app.search import SearchIndex
+from app.blocklist import TokenBlocklist
+from app.storage import public_car, stats_deltas, STATS_DIMENSIONS
+from app.storage.mongo import CAR_PROJECTION
 
-# Variables globales para la conexión
-client = None
-db = None
-users_collection = None
-cars_collection = None
+logger = logging.getLogger(__name__)
 
-def init_db(mongo_uri, database_name):
-    """Inicializar conexión a MongoDB"""
-    global client, db, users_collection, cars_collection
+# Backend de almacenamiento (app.storage) elegido con STORAGE_BACKEND
+storage = None
+# Resultado del último check_db (None = todavía no se comprobó)
+db_reachable = None
+
+def _reconnect_after_fork():
+    """Conexiones y locks no pueden cruzar un fork: cada hijo rehace los suyos"""
+    if storage is not None and not is_pool_worker():
+        storage.after_fork()
+
+os.register_at_fork(after_in_child=_reconnect_after_fork)
+
+def get_pool_stats():
+    """Estadísticas del pool de conexiones de este proceso"""
+    if storage is None:
+        return PoolStatsListener().stats()
+    return storage.pool_stats()
+
+# Caché de lectura para get_car_by_id (se configura con init_car_cache)
+car_cache = TTLCache()
+
+# Versión de cada colección en counters ('version:<colección>'): cada escritura
+# la incrementa y de ella salen los ETag. Cada proceso la guarda un momento en
+# memoria para que las peticiones condicionales no consulten la base de datos
+collection_versions = TTLCache()
+
+# Índice de búsqueda marca/modelo de este proceso (se configura con init_car_search)
+car_search_index = SearchIndex()
+os.register_at_fork(after_in_child=lambda: car_search_index.after_fork())
+
+# Filtro de Bloom de los tokens revocados de este proceso (se configura con init_token_blocklist)
+REVOKED_TOKENS = 'revoked_tokens'
+token_blocklist = TokenBlocklist()
+# La versión de revoked_tokens se guarda aparte, con su propio TTL: es lo que
+# tarda un logout en verse en los demás workers (ver version_cache)
+revoked_tokens_versions = TTLCache()
+os.register_at_fork(after_in_child=lambda: token_blocklist.after_fork())
+
+# Si la base de revocados no respondió, no se vuelve a consultar durante
+# REVOKED_TOKENS_RETRY_SECONDS: cada petición no debe esperar su timeout
+REVOKED_TOKENS_RETRY_SECONDS = 5
+revoked_tokens_unavailable = TTLCache(1, REVOKED_TOKENS_RETRY_SECONDS)
+
+# Secuencia de car_id: cada proceso reserva bloques de ids en la colección counters
+CAR_ID_COUNTER = 'car_id'
+_car_id_lock = threading.Lock()
+_car_id_block = {'size': 1, 'next': 1, 'end': 0, 'synced': False}  # rango reservado [next, end]
+
+def _reset_car_id_block():
+    """Descartar el bloque reservado (el proceso hijo no debe reutilizar el del padre)"""
+    global _car_id_lock
+    _car_id_lock = threading.Lock()
+    _car_id_block['next'], _car_id_block['end'] = 1, 0
+
+os.register_at_fork(after_in_child=_reset_car_id_block)
+
+def init_db(backend, car_id_block_size=1):
+    """
+    Inicializar el almacenamiento
+    
+    Args:
+        backend: Storage creado con app.storage.create_storage. El de MongoDB
+            no hace E/S aquí: el cliente se conecta en la primera operación.
+            La verificación de la conexión y de los índices está en check_db.
+    """
+    global storage
+    
+    if storage is not None and storage is not backend:
+        storage.close()
+    storage = backend
+    _reset_car_id_block()
+    _car_id_block['size'] = max(1, int(car_id_block_size))
+    _car_id_block['synced'] = False
+
+def check_db(create_indexes=True):
+    """
+    Probar la conexión al almacenamiento y crear o verificar los índices
+    
+    Un índice que no se puede crear o verificar solo se registra: la base
+    sigue disponible aunque las consultas sean más lentas.
+    
+    Returns:
+        bool: si el backend respondió al ping
+    """
+    global db_reachable
     
     try:
-        client = MongoClient(mongo_uri)
-        db = client[database_name]
-        users_collection = db.users
-        cars_collection = db.cars
-        
-        # Probar la conexión
-        client.admin.command('ping')
-        print("✅ Conexión a MongoDB exitosa")
-        return True
+        storage.ping()
+        logger.info("Conexión a la base de datos exitosa", extra={'fields': {'backend': storage.name}})
+        db_reachable = True
     except Exception as e:
-        print(f"❌ Error conectando a MongoDB: {e}")
-        print("⚠️  La aplicación requiere MongoDB para funcionar correctamente.")
-        client = None
-        db = None
-        return False
+        logger.error("Error conectando a la base de datos; la aplicación la requiere para funcionar correctamente",
+                     extra={'fields': {'backend': storage.name, 'error': str(e)}})
+        db_reachable = False
+        return db_reachable
+    
+    try:
+        ensure_indexes(create=create_indexes)
+    except Exception as e:
+        logger.warning("No se pudieron crear o verificar los índices",
+                       extra={'fields': {'backend': storage.name, 'error': str(e)}})
+    return db_reachable
+
+def check_db_in_background(create_indexes=True):
+    """Ejecutar check_db sin bloquear el arranque del worker"""
+    thread = threading.Thread(target=check_db, args=(create_indexes,), name='db-startup-check', daemon=True)
+    thread.start()
+    return thread
+
+def ensure_indexes(create=True):
+    """
+    Crear de forma idempotente los índices que declara el backend, o solo
+    verificarlos (create=False, p. ej. en producción donde los gestiona el DBA)
+    
+    Returns:
+        list: nombres "coleccion.indice" que faltan después de la verificación
+    """
+    if storage is None:
+        return []
+    
+    missing = storage.ensure_indexes(create=create)
+    for name in missing:
+        logger.warning("Falta un índice: las consultas harán un recorrido completo de la colección",
+                       extra={'fields': {'index': name}})
+    return missing
+
+def init_car_cache(max_size, ttl):
+    """Configurar la caché de carros por ID (max_size=0 la deshabilita)"""
+    global car_cache
+    car_cache = TTLCache(max_size, ttl)
+
+def invalidate_car(car_id):
+    """Quitar un carro de la caché; llamar después de cualquier escritura sobre él"""
+    car_cache.invalidate(int(car_id))
+
+def init_car_search(max_entries):
+    """Configurar el índice de /car/search (max_entries=0 lo deshabilita)"""
+    global car_search_index
+    car_search_index = SearchIndex(max_entries)
+
+def init_token_blocklist(capacity, false_positive_rate, version_ttl):
+    """
+    Configurar el filtro de Bloom de tokens revocados
+    
+    Args:
+        version_ttl: segundos que se reutiliza la versión de revoked_tokens
+            (lo que puede tardar un logout en rechazarse en otro worker)
+    """
+    global token_blocklist, revoked_tokens_versions
+    token_blocklist = TokenBlocklist(capacity, false_positive_rate)
+    revoked_tokens_versions = TTLCache(1, version_ttl)
+
+def get_car_cache_stats():
+    return car_cache.stats()
+
+def init_collection_versions(ttl):
+    """Configurar cuántos segundos se reutiliza la versión leída de counters"""
+    global collection_versions
+    collection_versions = TTLCache(16, ttl)
+
+def version_counter_id(collection_name):
+    return f'version:{collection_name}'
+
+def version_cache(collection_name):
+    """Caché de la versión de la colección: revoked_tokens tiene la suya (init_token_blocklist)"""
+    return revoked_tokens_versions if collection_name == REVOKED_TOKENS else collection_versions
+
+def remember_collection_version(collection_name, version):
+    """Guardar la versión leída o escrita; nunca retroceder a una anterior"""
+    cache = version_cache(collection_name)
+    cached = cache.get(collection_name)
+    if cached is not None and cached > version:
+        return cached
+    cache.set(collection_name, version)
+    return version
+
+def get_collection_version(collection_name):
+    """Versión actual de la colección (0 si nunca se escribió)"""
+    version = version_cache(collection_name).get(collection_name)
+    if version is None:
+        if storage is None:
+            raise Exception("La base de datos no está disponible.")
+        version = remember_collection_version(collection_name,
+                                              storage.get_counter(version_counter_id(collection_name)))
+    return version
+
+def bump_collection_version(collection_name):
+    """Incrementar la versión después de escribir en la colección"""
+    return remember_collection_version(collection_name,
+                                       storage.increment_counter(version_counter_id(collection_name)))
 
 def get_db_status():
-    """Obtener estado de la conexión a MongoDB"""
-    return db is not None
+    """
+    Obtener estado de la conexión a la base de datos
+    
+    No hace E/S: usa el resultado de check_db o del sondeo en segundo plano
+    (app.health), que actualizan db_reachable.
+    """
+    return storage is not None and db_reachable is not False
 
 # ========== FUNCIONES DE USUARIOS ==========
 
 def initialize_users():
-    """Inicializar usuarios en MongoDB si no existen"""
-    if db is None:
-        return
+    """
+    Inicializar usuarios si no existen
+    
+    Returns:
+        bool: True si se crearon los usuarios iniciales
+    """
+    if storage is None:
+        return False
     
     # Verificar si ya existen usuarios
-    if users_collection.count_documents({}) == 0:
+    if storage.users.count() == 0:
         users_data = [
             {
                 'user_id': 'user-2',
@@ -59,15 +245,30 @@ def initialize_users():
                 'created_at': datetime.now()
             }
         ]
-        users_collection.insert_many(users_data)
-        print("✅ Usuarios iniciales creados en MongoDB")
+        storage.users.insert_many(users_data)
+        return True
+    return False
 
 def get_user_by_username(username):
-    """Obtener usuario por username desde MongoDB"""
-    if db is None:
-        raise Exception("MongoDB no está disponible. No se puede autenticar usuarios.")
+    """Obtener usuario por username"""
+    if storage is None:
+        raise Exception("La base de datos no está disponible. No se puede autenticar usuarios.")
     
-    return users_collection.find_one({"username": username})
+    return storage.users.get_by_username(username)
+
+# Errores de autenticación compartidos por la versión síncrona y la ASGI
+AUTH_INVALID_CREDENTIALS = {
+    'error': 'Credenciales inválidas',
+    'message': 'Username o password incorrectos'
+}
+AUTH_BUSY = {
+    'error': 'Servidor ocupado',
+    'message': 'Demasiados inicios de sesión en curso. Intente de nuevo en unos segundos.'
+}
+AUTH_DB_UNAVAILABLE = {
+    'error': 'Error de base de datos',
+    'message': 'No se puede conectar a la base de datos. Verifique que MongoDB esté ejecutándose.'
+}
 
 def authenticate_user(username, password):
     """
@@ -80,96 +281,459 @@ def authenticate_user(username, password):
     """
     try:
         user = get_user_by_username(username)
-        print(user)
-        if not user or not check_password_hash(user['password_hash'], password):
-            return None, {
-                'error': 'Credenciales inválidas',
-                'message': 'Username o password incorrectos'
-            }, 401
+        logger.debug("Intento de login", extra={'fields': {'username': username, 'found': user is not None}})
+        if not user or not verify_password(user['password_hash'], password):
+            return None, AUTH_INVALID_CREDENTIALS, 401
         
         return user, None, None
         
+    except PasswordVerifierBusy:
+        return None, AUTH_BUSY, 503
     except Exception as e:
-        return None, {
-            'error': 'Error de base de datos',
-            'message': 'No se puede conectar a la base de datos. Verifique que MongoDB esté ejecutándose.'
-        }, 503
+        return None, AUTH_DB_UNAVAILABLE, 503
 
 def get_user_count():
     """Obtener número total de usuarios"""
-    if db is None:
+    if storage is None:
         return 0
-    return users_collection.count_documents({})
+    return storage.users.count()
+
+def revoke_token(jti, expires_at):
+    """Revocar un token (logout) hasta su exp"""
+    if storage is None:
+        raise Exception("La base de datos no está disponible. No se puede cerrar la sesión.")
+    
+    storage.revoked_tokens.add(jti, expires_at)
+    # La versión que deja este logout es la seq de la revocación: los demás
+    # workers agregan a su filtro solo las revocaciones con seq mayor que la suya
+    seq = storage.increment_counter(version_counter_id(REVOKED_TOKENS))
+    remember_collection_version(REVOKED_TOKENS, seq)
+    storage.revoked_tokens.set_seq(jti, seq)
+    token_blocklist.add(jti, seq)
+
+def is_token_revoked(jti):
+    """
+    True si el token fue revocado con logout
+    
+    Casi siempre lo resuelve el filtro de Bloom en memoria; solo los jti que
+    el filtro no puede descartar se confirman en la base de datos.
+    """
+    blocklist = token_blocklist
+    unavailable = revoked_tokens_unavailable.get(REVOKED_TOKENS) is not None
+    if not unavailable:
+        try:
+            blocklist.refresh(get_collection_version(REVOKED_TOKENS),
+                              lambda seq: storage.revoked_tokens.jtis_since(seq),
+                              lambda: storage.revoked_tokens.active_jtis())
+        except Exception as e:
+            # Sin base de datos se sigue con el último filtro que se pudo armar
+            unavailable = True
+            revoked_tokens_unavailable.set(REVOKED_TOKENS, True)
+            logger.warning("No se pudo actualizar la lista de tokens revocados", extra={'fields': {'error': str(e)}})
+    
+    if not blocklist.might_contain(jti):
+        return False
+    if unavailable:
+        # Si no se puede confirmar, el token se rechaza
+        return True
+    try:
+        return storage.revoked_tokens.contains(jti)
+    except Exception as e:
+        revoked_tokens_unavailable.set(REVOKED_TOKENS, True)
+        logger.warning("No se pudo confirmar si el token está revocado", extra={'fields': {'error': str(e)}})
+        return True
 
 # ========== FUNCIONES DE CARROS ==========
 
 def initialize_cars():
-    """Inicializar carros en MongoDB si no existen"""
-    if db is None:
-        return
+    """
+    Inicializar carros si no existen
+    
+    Returns:
+        bool: True si se crearon los carros iniciales
+    """
+    if storage is None:
+        return False
     
     # Verificar si ya existen carros
-    if cars_collection.count_documents({}) == 0:
+    created = storage.cars.count() == 0
+    if created:
         cars_data = [
-            {'id': 1, 'marca': 'Toyota', 'modelo': 'Corolla', 'año': 2020},
-            {'id': 2, 'marca': 'Honda', 'modelo': 'Civic', 'año': 2019},
-            {'id': 3, 'marca': 'Ford', 'modelo': 'Focus', 'año': 2018},
-            {'id': 4, 'marca': 'Volkswagen', 'modelo': 'Golf', 'año': 2019},
-            {'id': 5, 'marca': 'Chevrolet', 'modelo': 'Cruze', 'año': 2022}
+            {'car_id': 1, 'marca': 'Toyota', 'modelo': 'Corolla', 'año': 2020},
+            {'car_id': 2, 'marca': 'Honda', 'modelo': 'Civic', 'año': 2019},
+            {'car_id': 3, 'marca': 'Ford', 'modelo': 'Focus', 'año': 2018},
+            {'car_id': 4, 'marca': 'Volkswagen', 'modelo': 'Golf', 'año': 2019},
+            {'car_id': 5, 'marca': 'Chevrolet', 'modelo': 'Cruze', 'año': 2022}
         ]
-        cars_collection.insert_many(cars_data)
-        print("✅ carros iniciales creados en MongoDB")
+        storage.cars.insert_many(cars_data)
+        record_car_stats(cars_data)
+        bump_collection_version('cars')
+    
+    sync_car_id_counter()
+    return created
+
+def migrate_legacy_cars():
+    """Pasar los carros del esquema anterior ('id' sin 'car_id') al actual"""
+    if storage is None:
+        return 0
+    
+    migrated = storage.cars.migrate_legacy_ids()
+    if migrated:
+        logger.info("Carros migrados de 'id' a 'car_id'", extra={'fields': {'cars': migrated}})
+        bump_collection_version('cars')
+    return migrated
+
+def sync_car_id_counter():
+    """Asegurar que el contador de car_id no quede por debajo del mayor car_id existente"""
+    if storage is None:
+        return
+    
+    storage.raise_counter(CAR_ID_COUNTER, storage.cars.max_car_id())
+
+def reserve_car_ids(count):
+    """
+    Reservar atómicamente un rango de car_id con un solo incremento del contador
+    
+    Returns:
+        range: ids reservados, exclusivos para quien los pidió
+    """
+    if storage is None:
+        raise Exception("La base de datos no está disponible. No se pueden crear carros.")
+    
+    # Una vez por proceso: el contador puede no existir si la base no se sembró
+    if not _car_id_block['synced']:
+        sync_car_id_counter()
+        _car_id_block['synced'] = True
+    
+    end = storage.increment_counter(CAR_ID_COUNTER, count)
+    return range(end - count + 1, end + 1)
+
+def next_car_id():
+    """Obtener el próximo car_id, usando el bloque reservado por este proceso"""
+    with _car_id_lock:
+        if _car_id_block['next'] > _car_id_block['end']:
+            block = reserve_car_ids(_car_id_block['size'])
+            _car_id_block['next'], _car_id_block['end'] = block.start, block.stop - 1
+        
+        car_id = _car_id_block['next']
+        _car_id_block['next'] += 1
+        return car_id
+
+class CarQuery:
+    """
+    Consulta de carros componible que cada backend traduce a la suya
+    (pipeline de MongoDB con pipeline(), SQL o filtros en memoria)
+    
+    Los filtros se limitan a igualdad, prefijo anclado y rango de año para
+    que siempre puedan usar el índice marca/modelo/año o el de car_id, y la
+    proyección entrega los documentos ya listos para responder.
+    
+    Ejemplo:
+        CarQuery().exact('marca', 'Toyota').year_range(2018, 2020).limit(50).pipeline()
+    """
+    TEXT_FIELDS = ('marca', 'modelo')
+    SORT_FIELDS = ('car_id', 'marca', 'modelo', 'año')
+    
+    def __init__(self):
+        # campo -> ('eq', valor) | ('prefix', texto) | ('range', (mínimo, máximo))
+        self.conditions = {}
+        self.sort_field = 'car_id'
+        self.sort_direction = ASCENDING
+        self.limit_value = None
+        self.after_value = None
+    
+    def exact(self, field, value):
+        self.conditions[field] = ('eq', value)
+        return self
+    
+    def prefix(self, field, value):
+        """Prefijo sensible a mayúsculas; un regex anclado sí usa el índice"""
+        self.conditions[field] = ('prefix', value)
+        return self
+    
+    def year_range(self, minimum=None, maximum=None):
+        minimum = int(minimum) if minimum is not None else None
+        maximum = int(maximum) if maximum is not None else None
+        if minimum is not None or maximum is not None:
+            self.conditions['año'] = ('range', (minimum, maximum))
+        return self
+    
+    def sort(self, field, direction=ASCENDING):
+        if field not in self.SORT_FIELDS:
+            raise ValueError(f'sort debe ser uno de: {", ".join(self.SORT_FIELDS)}')
+        self.sort_field = field
+        self.sort_direction = direction
+        return self
+    
+    def after(self, car_id):
+        """Paginación keyset: carros posteriores a car_id en el orden actual"""
+        self.after_value = int(car_id)
+        return self
+    
+    def limit(self, count):
+        self.limit_value = int(count) if count else None
+        return self
+    
+    @property
+    def keyset(self):
+        """True si el orden permite paginar con after (solo por car_id)"""
+        return self.sort_field == 'car_id'
+    
+    def compile_filter(self):
+        """Filtro de MongoDB"""
+        filter_query = {}
+        for field, (operator, value) in self.conditions.items():
+            if operator == 'eq':
+                filter_query[field] = value
+            elif operator == 'prefix':
+                filter_query[field] = {'$regex': '^' + re.escape(value)}
+            else:
+                minimum, maximum = value
+                bounds = {}
+                if minimum is not None:
+                    bounds['$gte'] = minimum
+                if maximum is not None:
+                    bounds['$lte'] = maximum
+                filter_query[field] = bounds
+        if self.after_value is not None:
+            if not self.keyset:
+                raise ValueError('after solo se puede usar ordenando por car_id')
+            operator = '$gt' if self.sort_direction == ASCENDING else '$lt'
+            filter_query['car_id'] = {operator: self.after_value}
+        return filter_query
+    
+    def compile_sort(self):
+        sort = {self.sort_field: self.sort_direction}
+        if self.sort_field != 'car_id':
+            sort['car_id'] = self.sort_direction  # desempate estable
+        return sort
+    
+    def pipeline(self):
+        stages = [
+            {'$match': self.compile_filter()},
+            {'$sort': self.compile_sort()},
+        ]
+        if self.limit_value:
+            stages.append({'$limit': self.limit_value})
+        stages.append({'$project': CAR_PROJECTION})
+        return stages
+    
+    @classmethod
+    def from_args(cls, args):
+        """
+        Construir la consulta a partir de los query params
+        
+        marca, modelo: igualdad exacta
+        marca_prefix, modelo_prefix: prefijo
+        año, año_min, año_max: año exacto o rango
+        sort: campo de orden, con '-' delante para descendente
+        after: car_id de la página anterior
+        
+        Raises:
+            ValueError: con el mensaje para el cliente si algún valor no es válido
+        """
+        query = cls()
+        for field in cls.TEXT_FIELDS:
+            if args.get(field):
+                query.exact(field, args[field])
+            elif args.get(f'{field}_prefix'):
+                query.prefix(field, args[f'{field}_prefix'])
+        
+        try:
+            if args.get('año'):
+                query.exact('año', int(args['año']))
+            else:
+                query.year_range(args.get('año_min') or None, args.get('año_max') or None)
+        except ValueError:
+            raise ValueError('año, año_min y año_max deben ser enteros')
+        
+        sort = args.get('sort')
+        if sort:
+            direction = DESCENDING if sort.startswith('-') else ASCENDING
+            query.sort(sort.lstrip('-'), direction)
+        
+        if args.get('after') is not None:
+            try:
+                query.after(args['after'])
+            except ValueError:
+                raise ValueError('after debe ser un car_id entero')
+            query.compile_filter()
+        return query
 
 def get_car_by_id(car_id):
-    """Obtener carro por ID desde MongoDB"""
-    if db is None:
-        raise Exception("MongoDB no está disponible. No se pueden consultar carros.")
+    """Obtener carro por ID"""
+    if storage is None:
+        raise Exception("La base de datos no está disponible. No se pueden consultar carros.")
+    
+    car_id = int(car_id)
+    car = car_cache.get(car_id)
+    if car is None:
+        car = storage.cars.get(car_id)
+        if car is None:
+            return None
+        car_cache.set(car_id, car)
     
-    return cars_collection.find_one({"car_id": int(car_id)})
+    # Copia para que el llamador pueda modificarla sin tocar la caché
+    return dict(car)
 
-def get_all_cars_filtered(marca_filter=None, modelo_filter=None):
-    """Obtener todos los carros con filtros opcionales"""
-    if db is None:
-        raise Exception("MongoDB no está disponible. No se pueden consultar carros.")
+def get_all_cars_filtered(query, batch_size=None):
+    """
+    Ejecutar una CarQuery
     
-    # Construir filtro para MongoDB
-    filter_query = {}
-    if marca_filter:
-        filter_query["marca"] = {"$gte": int(marca_filter)}
-    if modelo_filter:
-        filter_query["modelo"] = {"$gte": int(modelo_filter)}
+    Devuelve el cursor del backend para que el llamador lo recorra sin
+    materializar toda la colección en memoria.
+    """
+    if storage is None:
+        raise Exception("La base de datos no está disponible. No se pueden consultar carros.")
     
-    return list(cars_collection.find(filter_query))
+    return storage.cars.find(query, batch_size=batch_size)
 
 def add_new_car(car_data):
-    """Agregar nuevo carro a MongoDB"""
-    if db is None:
-        raise Exception("MongoDB no está disponible. No se pueden crear carros.")
-    
-    # Obtener el próximo ID
-    max_car = cars_collection.find().sort("car_id", -1).limit(1)
-    next_id = 1
-    for car in max_car:
-        next_id = car["car_id"] + 1
-        break
+    """Agregar nuevo carro"""
+    if storage is None:
+        raise Exception("La base de datos no está disponible. No se pueden crear carros.")
     
     new_car = {
-        "car_id": next_id,
+        "car_id": next_car_id(),
         "marca": car_data["marca"],
         "modelo": car_data["modelo"],
         "año": car_data["año"]
     }
     
-    result = cars_collection.insert_one(new_car)
-    new_car["_id"] = result.inserted_id
-    return new_car
+    storage.cars.insert(new_car)
+    record_car_stats([new_car])
+    invalidate_car(new_car["car_id"])
+    bump_collection_version('cars')
+    return public_car(new_car)
+
+def add_new_cars_bulk(cars_data):
+    """
+    Agregar un lote de carros ya validados con una sola reserva de ids
+    y una inserción no ordenada (un documento inválido no detiene al resto)
+    
+    Returns:
+        list: (car_id, error) por cada carro, en el mismo orden de cars_data
+    """
+    if storage is None:
+        raise Exception("La base de datos no está disponible. No se pueden crear carros.")
+    
+    if not cars_data:
+        return []
+    
+    ids = reserve_car_ids(len(cars_data))
+    new_cars = [
+        {
+            "car_id": car_id,
+            "marca": car_data["marca"],
+            "modelo": car_data["modelo"],
+            "año": car_data["año"]
+        }
+        for car_id, car_data in zip(ids, cars_data)
+    ]
+    
+    errors = storage.cars.insert_many(new_cars)
+    record_car_stats([car for index, car in enumerate(new_cars) if index not in errors])
+    
+    for car in new_cars:
+        invalidate_car(car["car_id"])
+    if len(errors) < len(new_cars):
+        bump_collection_version('cars')
+    
+    return [
+        (None, errors[index]) if index in errors else (car["car_id"], None)
+        for index, car in enumerate(new_cars)
+    ]
+
+# ========== RESUMEN DEL INVENTARIO ==========
+
+def record_car_stats(cars, amount=1):
+    """
+    Actualizar el resumen después de agregar (amount=1) o quitar (amount=-1)
+    carros; todo camino que escriba carros debe llamarla
+    
+    Si falla solo se registra: el carro ya está guardado y el resumen se
+    corrige con `flask stats rebuild`.
+    """
+    deltas = stats_deltas(cars, amount)
+    if not deltas:
+        return
+    try:
+        storage.car_stats.increment(deltas)
+    except Exception as e:
+        logger.warning("No se pudo actualizar el resumen de inventario",
+                       extra={'fields': {'error': str(e), 'groups': len(deltas)}})
+
+def get_car_stats():
+    """
+    Total de carros y conteos por marca, año y marca/modelo, leídos del
+    resumen (cuesta lo que el número de grupos, no lo que el de carros)
+    """
+    if storage is None:
+        raise Exception("La base de datos no está disponible. No se pueden consultar estadísticas.")
+    
+    by_dimension = {dimension: [] for dimension in STATS_DIMENSIONS}
+    for (dimension, values), count in storage.car_stats.groups():
+        group = dict(zip(STATS_DIMENSIONS[dimension], values))
+        group['count'] = count
+        by_dimension[dimension].append(group)
+    
+    # Los grupos más grandes primero; a igual cantidad, por valor
+    for dimension, groups in by_dimension.items():
+        fields = STATS_DIMENSIONS[dimension]
+        groups.sort(key=lambda group: (-group['count'], [str(group[field]) for field in fields]))
+    
+    stats = {'total': sum(group['count'] for group in by_dimension['marca'])}
+    for dimension, groups in by_dimension.items():
+        stats[f'by_{dimension}'] = groups
+    return stats
+
+def rebuild_car_stats():
+    """Recalcular el resumen desde la colección de carros; devuelve el número de grupos"""
+    if storage is None:
+        raise Exception("La base de datos no está disponible.")
+    
+    groups = storage.car_stats.rebuild()
+    bump_collection_version('cars')
+    return groups
+
+def sync_car_stats():
+    """Reconstruir el resumen si su total no coincide con el número de carros"""
+    if storage is None:
+        return False
+    
+    if get_car_stats()['total'] == storage.cars.count():
+        return False
+    rebuild_car_stats()
+    return True
+
+def search_cars(text, limit):
+    """
+    Autocompletar: pares marca/modelo cuyas palabras empiezan con los términos
+    de text, sin distinguir mayúsculas ni acentos
+    
+    Responde desde el índice en memoria del proceso, que se rearma desde el
+    resumen de inventario cuando cambia la versión de la colección; si el
+    índice está deshabilitado o es muy grande, consulta la base de datos.
+    """
+    if storage is None:
+        raise Exception("La base de datos no está disponible. No se pueden buscar carros.")
+    
+    index = car_search_index
+    index.refresh(get_collection_version('cars'), lambda: (
+        (values, count)
+        for (dimension, values), count in storage.car_stats.groups()
+        if dimension == 'marca_modelo'
+    ))
+    if index.available:
+        return index.search(text, limit)
+    return storage.cars.search_models(text, limit)
 
 def get_car_count():
-    if db is None:
+    if storage is None:
         return 0
-    return cars_collection.count_documents({})
+    return storage.cars.count()
 
 def get_all_cars():
-    if db is None:
+    if storage is None:
         return []
-    return list(cars_collection.find({}))
\ No newline at end of file
+    return list(storage.cars.find(CarQuery()))
\ No newline at end of file
@@ -0,0 +1,91 @@
+import threading
+import time
+from pymongo import monitoring
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """
+    Estadísticas del pool de conexiones de pymongo
+
+    Lleva las conexiones abiertas y prestadas, los préstamos fallidos y el
+    tiempo que los hilos esperan para obtener una conexión.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.open_connections = 0
+            self.checked_out = 0
+            self.max_checked_out = 0
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.pools_cleared = 0
+            self.wait_time_total = 0.0
+            self.wait_time_max = 0.0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'open_connections': self.open_connections,
+                'checked_out': self.checked_out,
+                'max_checked_out': self.max_checked_out,
+                'checkouts': self.checkouts,
+                'checkout_failures': self.checkout_failures,
+                'pools_cleared': self.pools_cleared,
+                'wait_time_avg_ms': (self.wait_time_total / self.checkouts * 1000) if self.checkouts else 0.0,
+                'wait_time_max_ms': self.wait_time_max * 1000,
+            }
+
+    def _wait_time(self):
+        # El inicio y el fin de un préstamo se notifican en el mismo hilo
+        started = getattr(self._local, 'started', None)
+        self._local.started = None
+        return time.perf_counter() - started if started is not None else 0.0
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        waited = self._wait_time()
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+
+    def connection_check_out_failed(self, event):
+        self._wait_time()
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
@@ -1,9 +1,65 @@
+from datetime import datetime, timezone
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token
-from app.models import authenticate_user
+from flask_jwt_extended import (create_access_token, create_refresh_token, jwt_required, get_jwt,
+                                get_jwt_identity, decode_token)
+from app.models import authenticate_user, revoke_token
 
 auth_bp = Blueprint('auth', __name__)
 
+def read_credentials():
+    """
+    Leer username y password del cuerpo JSON
+    
+    Returns:
+        tuple: (username, password, error_response)
+    """
+    body = request.get_json(silent=True)
+    if not body or 'username' not in body or 'password' not in body:
+        return None, None, (jsonify({
+            'error': 'Datos inválidos',
+            'message': 'Se requieren username y password'
+        }), 400)
+    
+    return body['username'], body['password'], None
+
+def auth_error_response(error_response, status_code):
+    headers = {'Retry-After': '1'} if status_code == 503 else {}
+    return jsonify(error_response), status_code, headers
+
+def refresh_token_claims(refresh_token):
+    """
+    Claims que enlazan un access token con su refresh token
+    
+    El logout los usa para revocar también el refresh token.
+    """
+    claims = decode_token(refresh_token)
+    return {
+        'refresh_jti': claims['jti'],
+        'refresh_exp': claims['exp']
+    }
+
+def login_response(user):
+    """Crear los tokens JWT (acceso y refresh) del usuario autenticado y la respuesta del login"""
+    user_id = user.get('user_id') or user.get('id')  # Compatibilidad con ambos formatos
+    claims = {
+        'role': user['role'],
+        'user_id': user_id
+    }
+    refresh_token = create_refresh_token(identity=user['username'], additional_claims=claims)
+    access_token = create_access_token(identity=user['username'],
+                                       additional_claims={**claims, **refresh_token_claims(refresh_token)})
+    
+    return jsonify({
+        'message': 'Login exitoso',
+        'access_token': access_token,
+        'refresh_token': refresh_token,
+        'user': {
+            'id': user_id,
+            'username': user['username'],
+            'role': user['role']
+        }
+    })
+
 @auth_bp.route('/login', methods=['POST'])
 def login():
     """
@@ -15,36 +71,98 @@ def login():
         "password": "string"
     }
     """
-    if not request.json or 'username' not in request.json or 'password' not in request.json:
-        return jsonify({
-            'error': 'Datos inválidos',
-            'message': 'Se requieren username y password'
-        }), 400
-    
-    username = request.json['username']
-    password = request.json['password']
+    username, password, error_response = read_credentials()
+    if error_response:
+        return error_response
     
     # Autenticar usuario
     user, error_response, status_code = authenticate_user(username, password)
     if error_response:
-        return jsonify(error_response), status_code
+        return auth_error_response(error_response, status_code)
     
-    # Crear token JWT
-    user_id = user.get('user_id') or user.get('id')  # Compatibilidad con ambos formatos
+    return login_response(user)
+
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    """
+    Obtener un nuevo access token con el refresh token del login
+    
+    Header requerido: Authorization: Bearer <refresh_token>
+    
+    No verifica la contraseña ni consulta al usuario: el rol y el user_id
+    salen de los claims del refresh token.
+    """
+    claims = get_jwt()
     access_token = create_access_token(
-        identity=username,
+        identity=get_jwt_identity(),
         additional_claims={
-            'role': user['role'],
-            'user_id': user_id
+            'role': claims.get('role'),
+            'user_id': claims.get('user_id'),
+            'refresh_jti': claims['jti'],
+            'refresh_exp': claims['exp']
         }
     )
+    return jsonify({'access_token': access_token})
+
+def read_refresh_token():
+    """
+    Claims del refresh_token opcional del cuerpo del logout
     
-    return jsonify({
-        'message': 'Login exitoso',
-        'access_token': access_token,
-        'user': {
-            'id': user_id,
-            'username': user['username'],
-            'role': user['role']
-        }
-    })
\ No newline at end of file
+    Returns:
+        tuple: (claims o None, error_response)
+    """
+    body = request.get_json(silent=True)
+    if body is None:
+        return None, None
+    if not isinstance(body, dict):
+        return None, (jsonify({
+            'error': 'Datos inválidos',
+            'message': 'El cuerpo debe ser un objeto JSON'
+        }), 400)
+    if not body.get('refresh_token'):
+        return None, None
+    
+    try:
+        claims = decode_token(body['refresh_token'], allow_expired=True)
+    except Exception:
+        claims = None
+    if not claims or claims.get('type') != 'refresh' or claims.get('sub') != get_jwt_identity():
+        return None, (jsonify({
+            'error': 'Datos inválidos',
+            'message': 'refresh_token no es un refresh token válido de este usuario'
+        }), 400)
+    return claims, None
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required()
+def logout():
+    """
+    Cerrar sesión: el token de la petición y el refresh token con el que se
+    emitió (claim refresh_jti) quedan revocados hasta su exp
+    
+    Header requerido: Authorization: Bearer <token>
+    Body JSON opcional: {"refresh_token": "string"} para revocar otro refresh
+    token del usuario (p. ej. uno emitido antes de que existiera refresh_jti)
+    """
+    refresh_claims, error_response = read_refresh_token()
+    if error_response:
+        return error_response
+    
+    claims = get_jwt()
+    revocations = {claims['jti']: claims['exp']}
+    if claims.get('refresh_jti'):
+        revocations[claims['refresh_jti']] = claims['refresh_exp']
+    if refresh_claims:
+        revocations[refresh_claims['jti']] = refresh_claims['exp']
+    
+    try:
+        for jti, exp in revocations.items():
+            revoke_token(jti, datetime.fromtimestamp(exp, timezone.utc))
+    except Exception as e:
+        return auth_error_response({
+            'error': 'Error de base de datos',
+            'message': 'No se puede conectar a la base de datos. Verifique que MongoDB esté ejecutándose.'
+        }, 503)
+    
+    return jsonify({'message': 'Sesión cerrada'})
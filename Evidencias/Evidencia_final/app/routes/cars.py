@@ -1,24 +1,51 @@
-from flask import Blueprint, request, jsonify
-from app.models import get_car_by_id, get_all_cars_filtered, add_new_car
-from app.utils import role_required, admin_required
+import json
+import logging
+from itertools import chain
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context, make_response
+from app.models import (get_car_by_id, get_all_cars_filtered, add_new_car, add_new_cars_bulk, CarQuery,
+                        get_collection_version, get_car_stats, search_cars)
+from app.utils import role_required, admin_required, collection_etag, add_cache_headers, not_modified
+from app.export import EXPORT_FORMATS, read_batches, export_cars
 
 car_bp = Blueprint('car', __name__)
+logger = logging.getLogger(__name__)
+
+STREAM_FORMATS = ('ndjson', 'json')
+CAR_FIELDS = ('marca', 'modelo', 'año')
+
+def stream_cars(first_car, cursor, stream_format):
+    """Generar el cuerpo de la respuesta directamente desde el cursor"""
+    dumps = current_app.json.dumps
+    if stream_format == 'ndjson':
+        if first_car is not None:
+            yield dumps(first_car) + "\n"
+        for car in cursor:
+            yield dumps(car) + "\n"
+        return
+    
+    # Arreglo JSON enviado por partes (chunked)
+    yield "["
+    if first_car is not None:
+        yield dumps(first_car)
+        for car in cursor:
+            yield "," + dumps(car)
+    yield "]"
 
 @car_bp.route('/<string:car_id>/', methods=["GET"])
 @role_required
 def get_car(car_id):
-    """Obtener carro por ID"""
+    """Obtener carro por ID (responde 304 si el ETag del cliente sigue vigente)"""
     try:
+        etag = collection_etag('cars', get_collection_version('cars'))
+        unchanged = not_modified(etag)
+        if unchanged:
+            return unchanged
+        
         car = get_car_by_id(car_id)
         if car:
-            # Normalizar la respuesta para mantener compatibilidad
-            if '_id' in car:
-                del car['_id']  # Remover ObjectId de MongoDB
-            if 'car_id' in car:
-                car['id'] = car['car_id']  # Mantener compatibilidad con 'id'
-            return car, 200
+            return add_cache_headers(make_response(car, 200), etag)
         else:
-            print("ERROR")
+            logger.debug("Carro no encontrado", extra={'fields': {'car_id': car_id}})
             return {"mensaje": "Mesa no existe"}, 404
     except Exception as e:
         return jsonify({
@@ -26,39 +53,227 @@ def get_car(car_id):
             'message': 'No se puede conectar a la base de datos. Verifique que MongoDB esté ejecutándose.'
         }), 503
 
+def parse_listing_args():
+    """
+    Leer y validar los query params del listado de carros
+    
+    Returns:
+        tuple: (params, error_response); params tiene stream, limit y
+        query (la CarQuery ya compilable)
+    """
+    stream_format = request.args.get("stream")
+    logger.debug("Listado de carros", extra={'fields': {'args': request.args.to_dict()}})
+    
+    if stream_format is not None and stream_format not in STREAM_FORMATS:
+        return None, (jsonify({
+            'error': 'Parámetros inválidos',
+            'message': f'stream debe ser uno de: {", ".join(STREAM_FORMATS)}'
+        }), 400)
+    
+    try:
+        query = CarQuery.from_args(request.args)
+    except ValueError as e:
+        return None, (jsonify({
+            'error': 'Parámetros inválidos',
+            'message': str(e)
+        }), 400)
+    
+    limit = request.args.get("limit", type=int)
+    if limit is not None and limit < 1:
+        return None, (jsonify({
+            'error': 'Parámetros inválidos',
+            'message': 'limit debe ser un entero positivo'
+        }), 400)
+    
+    # Las páginas normales siempre van acotadas; el streaming puede no tener límite
+    if stream_format is None:
+        limit = min(limit or current_app.config['CARS_PAGE_SIZE'],
+                    current_app.config['CARS_MAX_PAGE_SIZE'])
+    query.limit(limit)
+    
+    return {'stream': stream_format, 'limit': limit, 'query': query}, None
+
+def page_response(cars, query, etag):
+    """Respuesta de una página del listado, con el token de la siguiente"""
+    result = list(cars)
+    
+    headers = {}
+    if query.keyset and result and len(result) == query.limit_value:
+        headers['X-Next-After'] = str(result[-1]['car_id'])
+    return add_cache_headers(make_response(result, 200, headers), etag)
+
 @car_bp.route('', methods=["GET"])
 @role_required
 def get_all_cars():
-    """Obtener todos los carros con filtros opcionales"""
-    marca_query_param = request.args.get("marca")
-    modelo_query_param = request.args.get("modelo")
-    print(f"marca {marca_query_param}, modelo {modelo_query_param}")
+    """
+    Obtener carros con filtros opcionales y paginación por car_id
+    
+    Query params:
+        marca, modelo / marca_prefix, modelo_prefix: igualdad o prefijo
+        año / año_min, año_max: año exacto o rango
+        sort: car_id (por defecto), marca, modelo o año; '-' para descendente
+        limit: tamaño de página (por defecto CARS_PAGE_SIZE)
+        after: token de la página siguiente (header X-Next-After)
+        stream: 'ndjson' o 'json' para transmitir el resultado desde el cursor
+    
+    Con If-None-Match responde 304 sin consultar los carros mientras la
+    colección no cambie.
+    """
+    params, error_response = parse_listing_args()
+    if error_response:
+        return error_response
+    stream_format = params['stream']
     
     try:
-        cars = get_all_cars_filtered(marca_query_param, modelo_query_param)
+        etag = collection_etag('cars', get_collection_version('cars'))
+        unchanged = not_modified(etag)
+        if unchanged:
+            return unchanged
+        
+        cursor = get_all_cars_filtered(
+            params['query'],
+            batch_size=current_app.config['CARS_STREAM_BATCH_SIZE']
+        )
         
-        # Normalizar la respuesta para mantener compatibilidad
-        result = []
-        for car in cars:
-            car_copy = car.copy()
-            if '_id' in car_copy:
-                del car_copy['_id']  # Remover ObjectId de MongoDB
-            if 'car_id' in car_copy:
-                car_copy['id'] = car_copy['car_id']  # Mantener compatibilidad con 'id'
-            result.append(car_copy)
+        if stream_format:
+            # Leer el primer lote aquí para que los errores de conexión devuelvan 503
+            first_car = next(cursor, None)
+            mimetype = 'application/x-ndjson' if stream_format == 'ndjson' else 'application/json'
+            return add_cache_headers(Response(
+                stream_with_context(stream_cars(first_car, cursor, stream_format)),
+                mimetype=mimetype
+            ), etag)
+        
+        return page_response(cursor, params['query'], etag)
+    except Exception as e:
+        return jsonify({
+            'error': 'Error de base de datos',
+            'message': 'No se puede conectar a la base de datos. Verifique que MongoDB esté ejecutándose.'
+        }), 503
+
+@car_bp.route('/stats', methods=["GET"])
+@role_required
+def car_stats():
+    """
+    Estadísticas del inventario: total y conteos por marca, año y marca/modelo
+    
+    Se leen del resumen que se actualiza en cada alta de carros, sin recorrer
+    la colección; comparte la versión (y el 304) con el listado.
+    """
+    try:
+        etag = collection_etag('car_stats', get_collection_version('cars'))
+        unchanged = not_modified(etag)
+        if unchanged:
+            return unchanged
+        
+        return add_cache_headers(make_response(get_car_stats(), 200), etag)
+    except Exception as e:
+        return jsonify({
+            'error': 'Error de base de datos',
+            'message': 'No se puede conectar a la base de datos. Verifique que MongoDB esté ejecutándose.'
+        }), 503
+
+@car_bp.route('/search', methods=["GET"])
+@role_required
+def search():
+    """
+    Autocompletar marca y modelo
+    
+    Query params:
+        q: texto buscado; cada palabra debe ser prefijo de una palabra de la
+           marca o del modelo, sin distinguir mayúsculas ni acentos
+        limit: cantidad de resultados (por defecto CARS_SEARCH_LIMIT)
+    
+    Devuelve los pares marca/modelo con su cantidad de carros, los más
+    numerosos primero.
+    """
+    text = request.args.get('q', '')
+    if not text.strip():
+        return jsonify({
+            'error': 'Parámetros inválidos',
+            'message': 'Se requiere q'
+        }), 400
+    
+    limit = request.args.get('limit', current_app.config['CARS_SEARCH_LIMIT'], type=int)
+    if limit < 1:
+        return jsonify({
+            'error': 'Parámetros inválidos',
+            'message': 'limit debe ser un entero positivo'
+        }), 400
+    limit = min(limit, current_app.config['CARS_SEARCH_MAX_LIMIT'])
+    
+    try:
+        return jsonify({'q': text, 'results': search_cars(text, limit)}), 200
+    except Exception as e:
+        return jsonify({
+            'error': 'Error de base de datos',
+            'message': 'No se puede conectar a la base de datos. Verifique que MongoDB esté ejecutándose.'
+        }), 503
 
-        return result, 200
+@car_bp.route('/export', methods=["GET"])
+@admin_required
+def export_catalog():
+    """
+    Exportar el catálogo completo (solo administradores)
+    
+    Query params:
+        format: ndjson (por defecto), csv o parquet (si pyarrow está instalado)
+        marca, modelo, año, sort... : los mismos filtros que GET /car
+        limit: opcional; sin él se exportan todos los carros que cumplan los filtros
+    
+    Se transmite desde el cursor por lotes de CARS_EXPORT_BATCH_SIZE, sin
+    cargar el resultado completo en memoria.
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({
+            'error': 'Parámetros inválidos',
+            'message': f'format debe ser uno de: {", ".join(EXPORT_FORMATS)}'
+        }), 400
+    
+    try:
+        query = CarQuery.from_args(request.args)
+    except ValueError as e:
+        return jsonify({
+            'error': 'Parámetros inválidos',
+            'message': str(e)
+        }), 400
+    
+    limit = request.args.get("limit", type=int)
+    if limit is not None and limit < 1:
+        return jsonify({
+            'error': 'Parámetros inválidos',
+            'message': 'limit debe ser un entero positivo'
+        }), 400
+    query.limit(limit)
+    
+    batch_size = current_app.config['CARS_EXPORT_BATCH_SIZE']
+    try:
+        cursor = get_all_cars_filtered(query, batch_size=batch_size)
+        # Leer el primer lote aquí para que los errores de conexión devuelvan 503
+        batches = read_batches(cursor, batch_size)
+        first_batch = next(batches, None)
     except Exception as e:
         return jsonify({
             'error': 'Error de base de datos',
             'message': 'No se puede conectar a la base de datos. Verifique que MongoDB esté ejecutándose.'
         }), 503
+    
+    if first_batch is not None:
+        batches = chain([first_batch], batches)
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    logger.info("Exportación de carros", extra={'fields': {'format': export_format, 'args': request.args.to_dict()}})
+    return Response(
+        stream_with_context(export_cars(export_format, batches, current_app.json.dumps)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=cars.{extension}'}
+    )
 
 @car_bp.route('', methods=["POST"])
 @admin_required
 def post_car():
     """Crear nuevo carro (solo administradores)"""
-    print(f"Body: {request.json}")
+    logger.debug("Crear carro", extra={'fields': {'body': request.json}})
     body = request.json
     
     # Validar datos requeridos
@@ -76,16 +291,94 @@ def post_car():
         }
         
         new_car = add_new_car(new_car_data)
-        
-        # Normalizar respuesta
-        if '_id' in new_car:
-            del new_car['_id']
-        if 'car_id' in new_car:
-            new_car['id'] = new_car['car_id']
-        
         return new_car, 201
     except Exception as e:
         return jsonify({
             'error': 'Error de base de datos',
             'message': 'No se puede conectar a la base de datos. Verifique que MongoDB esté ejecutándose.'
-        }), 503
\ No newline at end of file
+        }), 503
+
+def validate_car_row(row):
+    """Validar un carro de la carga masiva; devuelve el mensaje de error o None"""
+    if not isinstance(row, dict):
+        return 'Cada fila debe ser un objeto JSON'
+    missing = [key for key in CAR_FIELDS if key not in row]
+    if missing:
+        return f'Faltan campos: {", ".join(missing)}'
+    if not isinstance(row['marca'], str) or not isinstance(row['modelo'], str):
+        return 'marca y modelo deben ser texto'
+    if isinstance(row['año'], bool) or not isinstance(row['año'], int):
+        return 'año debe ser un entero'
+    return None
+
+def read_bulk_rows():
+    """
+    Recorrer las filas del cuerpo: arreglo JSON o NDJSON leído línea a línea
+    
+    Yields:
+        tuple: (fila, error de parseo o None)
+    """
+    if request.mimetype == 'application/x-ndjson':
+        for line in request.stream:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line), None
+            except ValueError:
+                yield None, 'JSON inválido'
+        return
+    
+    for row in request.get_json(silent=True):
+        yield row, None
+
+@car_bp.route('/bulk', methods=["POST"])
+@admin_required
+def post_cars_bulk():
+    """
+    Carga masiva de carros (solo administradores)
+    
+    Acepta un arreglo JSON o NDJSON (Content-Type: application/x-ndjson).
+    Las filas válidas se insertan por lotes de CAR_BULK_CHUNK_SIZE y se
+    devuelve el resultado de cada fila: {"row": n, "id": ...} o {"row": n, "error": ...}
+    """
+    if request.mimetype != 'application/x-ndjson' and not isinstance(request.get_json(silent=True), list):
+        return jsonify({
+            'error': 'Datos inválidos',
+            'message': 'Se requiere un arreglo JSON o un cuerpo NDJSON'
+        }), 400
+    
+    chunk_size = current_app.config['CAR_BULK_CHUNK_SIZE']
+    results = []
+    chunk = []  # (fila, carro) pendientes de insertar
+    
+    def flush():
+        outcomes = add_new_cars_bulk([car for _, car in chunk])
+        for (row_number, _), (car_id, error) in zip(chunk, outcomes):
+            results[row_number] = {'row': row_number, 'error': error} if error else {'row': row_number, 'id': car_id}
+        chunk.clear()
+    
+    try:
+        for row_number, (row, error) in enumerate(read_bulk_rows()):
+            error = error or validate_car_row(row)
+            if error:
+                results.append({'row': row_number, 'error': error})
+                continue
+            
+            results.append(None)
+            chunk.append((row_number, {key: row[key] for key in CAR_FIELDS}))
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+    except Exception as e:
+        return jsonify({
+            'error': 'Error de base de datos',
+            'message': 'No se puede conectar a la base de datos. Verifique que MongoDB esté ejecutándose.'
+        }), 503
+    
+    failed = sum(1 for result in results if 'error' in result)
+    return jsonify({
+        'inserted': len(results) - failed,
+        'failed': failed,
+        'results': results
+    }), 201 if failed == 0 else 207
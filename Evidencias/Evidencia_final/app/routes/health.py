@@ -0,0 +1,17 @@
+from flask import Blueprint, jsonify
+from app.health import get_health, is_ready
+
+health_bp = Blueprint('health', __name__)
+
+@health_bp.route('/healthz', methods=["GET"])
+def healthz():
+    """Liveness: el proceso atiende peticiones (no depende de la base de datos)"""
+    return jsonify({'status': 'ok'}), 200
+
+@health_bp.route('/readyz', methods=["GET"])
+def readyz():
+    """Readiness: la base de datos respondió al último sondeo en segundo plano"""
+    database = get_health()
+    if is_ready():
+        return jsonify({'status': 'ok', 'database': database}), 200
+    return jsonify({'status': 'unavailable', 'database': database}), 503
@@ -4,13 +4,23 @@ from app.models import get_db_status
 
 pages_bp = Blueprint('pages', __name__)
 
+# Última página renderizada como una tupla (key, html) que se reemplaza
+# entera: solo cambia con la hora (al segundo) o el estado
+_welcome_page = {'last': (None, None)}
+
 @pages_bp.route('/welcome', methods=["GET"])
 def welcome_page():
     """Página de bienvenida sencilla con estilos"""
     # Determinar estado de la base de datos
+    # (resultado del sondeo en segundo plano, sin consultar MongoDB)
     db_status = "conectado" if get_db_status() else "desconectado"
     current_time = datetime.now().strftime("%H:%M:%S")
     
-    return render_template('welcome.html', 
-                        db_status=db_status, 
-                        current_time=current_time)
\ No newline at end of file
+    key = (db_status, current_time)
+    cached_key, html = _welcome_page['last']
+    if cached_key != key:
+        html = render_template('welcome.html', 
+                            db_status=db_status, 
+                            current_time=current_time)
+        _welcome_page['last'] = (key, html)
+    return html
\ No newline at end of file
@@ -0,0 +1,128 @@
+"""
+Búsqueda por prefijo (autocompletar) sobre marca y modelo
+
+Cada worker guarda en memoria los pares marca/modelo distintos con su
+cantidad de carros y una lista ordenada de las palabras normalizadas
+(minúsculas y sin acentos) de cada par. Un prefijo se resuelve con dos
+búsquedas binarias sobre esa lista, sin consultar la base de datos.
+
+El índice se arma desde el resumen de inventario (car_stats), que ya tiene
+los pares con sus cantidades, y se vuelve a armar cuando cambia la versión
+de la colección de carros, así que también ve lo que escriben otros workers.
+"""
+import bisect
+import threading
+import unicodedata
+
+# Mayor que cualquier carácter: (prefijo + WORD_END) acota el rango del prefijo
+WORD_END = '\U0010ffff'
+
+def normalize(text):
+    """Minúsculas y sin acentos: 'Citroën' -> 'citroen'"""
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+def search_terms(text):
+    return normalize(text).split()
+
+def pair_words(marca, modelo):
+    return set(normalize(f'{marca} {modelo}').split())
+
+def pair_matches(terms, marca, modelo):
+    """Cada término es prefijo de alguna palabra de la marca o del modelo"""
+    words = pair_words(marca, modelo)
+    return all(any(word.startswith(term) for word in words) for term in terms)
+
+def rank(results, limit):
+    """Los pares con más carros primero; a igual cantidad, por nombre"""
+    results.sort(key=lambda result: (-result['count'], normalize(result['marca']), normalize(result['modelo'])))
+    return results[:limit]
+
+class SearchIndex:
+    """
+    Índice ordenado de palabras -> pares marca/modelo, de un solo proceso
+
+    Si hay más de max_entries pares el índice no se arma (available queda en
+    False) y la búsqueda debe ir a la base de datos.
+    """
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries
+        self.version = None
+        self.available = False
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._pairs = []   # id -> ((marca, modelo), cantidad)
+        self._words = []   # lista ordenada de (palabra, id)
+
+    def rebuild(self, groups, version):
+        """
+        Reemplazar el contenido con groups: iterable de ((marca, modelo), cantidad)
+
+        Returns:
+            bool: True si el índice quedó disponible
+        """
+        pairs = []
+        for pair, count in groups:
+            pairs.append((tuple(pair), count))
+            if self.max_entries is not None and len(pairs) > self.max_entries:
+                pairs = None
+                break
+
+        words = []
+        if pairs is not None:
+            words = sorted(
+                (word, pair_id)
+                for pair_id, ((marca, modelo), _) in enumerate(pairs)
+                for word in pair_words(marca, modelo)
+            )
+
+        with self._lock:
+            self._pairs, self._words = pairs or [], words
+            self.available = pairs is not None
+            self.version = version
+        return self.available
+
+    def refresh(self, version, load_groups):
+        """
+        Rearmar el índice si está en otra versión
+
+        Un solo hilo lo rearma; mientras tanto los demás siguen usando el
+        índice anterior si ya había uno (si no, esperan).
+        """
+        if self.version == version:
+            return
+        if not self._rebuild_lock.acquire(blocking=not self.available):
+            return
+        try:
+            if self.version != version:
+                self.rebuild(load_groups(), version)
+        finally:
+            self._rebuild_lock.release()
+
+    def search(self, text, limit):
+        """Pares cuyas palabras empiezan con cada término de text: [{'marca', 'modelo', 'count'}]"""
+        terms = search_terms(text)
+        if not terms:
+            return []
+
+        with self._lock:
+            candidates = None
+            for term in terms:
+                start = bisect.bisect_left(self._words, (term,))
+                end = bisect.bisect_left(self._words, (term + WORD_END,), start)
+                found = {pair_id for _, pair_id in self._words[start:end]}
+                candidates = found if candidates is None else candidates & found
+                if not candidates:
+                    return []
+            results = [
+                {'marca': self._pairs[pair_id][0][0], 'modelo': self._pairs[pair_id][0][1],
+                 'count': self._pairs[pair_id][1]}
+                for pair_id in candidates
+            ]
+        return rank(results, limit)
+
+    def after_fork(self):
+        # Los locks pudieron quedar tomados por hilos del padre
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
@@ -0,0 +1,31 @@
+"""
+Backends de almacenamiento de usuarios y carros
+
+STORAGE_BACKEND elige el backend: 'mongo' (MongoDB), 'memory' (en el
+proceso, sin servidor) o 'sqlite' (archivo SQLITE_PATH).
+"""
+from app.storage.base import (Storage, UserRepository, CarRepository, CarStatsRepository, RevokedTokenRepository,
+                              public_car, STATS_DIMENSIONS, stats_deltas)
+from app.storage.memory import MemoryStorage
+from app.storage.mongo import MongoStorage, mongo_client_options
+from app.storage.sqlite import SQLiteStorage
+
+STORAGE_BACKENDS = ('mongo', 'memory', 'sqlite')
+
+def create_storage(app_config, event_listeners=None):
+    """
+    Crear el backend configurado en STORAGE_BACKEND
+    
+    Args:
+        event_listeners: listeners de monitoreo de pymongo (solo backend mongo)
+    """
+    backend = app_config['STORAGE_BACKEND']
+    if backend == 'mongo':
+        return MongoStorage(app_config['MONGO_URI'], app_config['DATABASE_NAME'],
+                            options=mongo_client_options(app_config),
+                            event_listeners=event_listeners)
+    if backend == 'memory':
+        return MemoryStorage()
+    if backend == 'sqlite':
+        return SQLiteStorage(app_config['SQLITE_PATH'])
+    raise ValueError(f"STORAGE_BACKEND debe ser uno de: {', '.join(STORAGE_BACKENDS)}")
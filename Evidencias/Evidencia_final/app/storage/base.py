@@ -0,0 +1,209 @@
+"""
+Interfaz de los backends de almacenamiento
+
+app.models no usa una base de datos concreta: trabaja con el Storage elegido
+por STORAGE_BACKEND, que expone un repositorio de usuarios, uno de carros, el
+resumen de estadísticas del inventario y contadores atómicos (secuencia de
+car_id y versiones de colección). Los repositorios de carros devuelven los
+carros ya en su forma pública (public_car).
+"""
+from collections import Counter
+from app.mongo_stats import PoolStatsListener
+from app.search import search_terms, pair_matches, rank
+
+# Agrupaciones del resumen de inventario: nombre -> campos del carro
+STATS_DIMENSIONS = {
+    'marca': ('marca',),
+    'año': ('año',),
+    'marca_modelo': ('marca', 'modelo'),
+}
+
+def public_car(car):
+    """Forma pública de un carro: sin campos internos y con 'id' como alias de car_id"""
+    return {
+        'car_id': car['car_id'],
+        'id': car['car_id'],
+        'marca': car['marca'],
+        'modelo': car['modelo'],
+        'año': car['año']
+    }
+
+class UserRepository:
+    """Usuarios, identificados por username"""
+
+    def get_by_username(self, username):
+        """Documento del usuario (con password_hash) o None"""
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def insert_many(self, users):
+        raise NotImplementedError
+
+class CarRepository:
+    """Carros, identificados por car_id"""
+
+    def get(self, car_id):
+        """Carro público o None"""
+        raise NotImplementedError
+
+    def find(self, query, batch_size=None):
+        """
+        Ejecutar una CarQuery (filtros, orden, after y limit)
+        
+        Devuelve un iterador que el llamador puede recorrer sin materializar
+        todos los resultados; los errores de conexión se lanzan al llamar.
+        """
+        raise NotImplementedError
+
+    def insert(self, car):
+        """Insertar un carro con car_id ya asignado (falla si el car_id existe)"""
+        raise NotImplementedError
+
+    def insert_many(self, cars):
+        """
+        Insertar varios carros sin detenerse en el primero que falle
+        
+        Returns:
+            dict: posición en cars -> mensaje de error, solo de los que fallaron
+        """
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def max_car_id(self):
+        """Mayor car_id guardado (0 si no hay carros)"""
+        raise NotImplementedError
+
+    def migrate_legacy_ids(self):
+        """
+        Completar car_id en carros guardados con un esquema anterior
+        
+        Returns:
+            int: carros migrados (0 si el backend no tiene datos antiguos)
+        """
+        return 0
+
+    def search_models(self, text, limit):
+        """
+        Búsqueda de pares marca/modelo en la base, para cuando el worker no
+        tiene el índice en memoria (app.search)
+        
+        Por defecto recorre los grupos marca/modelo del resumen de inventario.
+        
+        Returns:
+            list: [{'marca', 'modelo', 'count'}], a lo más limit
+        """
+        terms = search_terms(text)
+        results = []
+        for (dimension, values), count in self.storage.car_stats.groups():
+            if dimension == 'marca_modelo' and pair_matches(terms, *values):
+                results.append({'marca': values[0], 'modelo': values[1], 'count': count})
+        return rank(results, limit)
+
+def stats_deltas(cars, amount=1):
+    """
+    Cambios del resumen por agregar (amount=1) o quitar (amount=-1) carros
+    
+    Returns:
+        Counter: (dimensión, valores) -> cantidad a sumar
+    """
+    deltas = Counter()
+    for car in cars:
+        for dimension, fields in STATS_DIMENSIONS.items():
+            deltas[(dimension, tuple(car[field] for field in fields))] += amount
+    return deltas
+
+class CarStatsRepository:
+    """
+    Conteo de carros por cada grupo de STATS_DIMENSIONS
+    
+    Se mantiene al escribir carros con increment, así que leerlo cuesta lo
+    que el número de grupos y no lo que el número de carros.
+    """
+
+    def increment(self, deltas):
+        """Aplicar un Counter de stats_deltas; cada grupo se actualiza de forma atómica"""
+        raise NotImplementedError
+
+    def groups(self):
+        """Iterador de ((dimensión, valores), cantidad) con los grupos no vacíos"""
+        raise NotImplementedError
+
+    def rebuild(self):
+        """
+        Recalcular el resumen completo desde los carros
+        
+        Returns:
+            int: número de grupos
+        """
+        raise NotImplementedError
+
+class RevokedTokenRepository:
+    """jti de los tokens revocados con logout, guardados hasta su exp"""
+
+    def add(self, jti, expires_at):
+        """Revocar jti hasta expires_at (datetime en UTC), todavía sin seq; repetirlo no falla"""
+        raise NotImplementedError
+
+    def set_seq(self, jti, seq):
+        """Guardar la versión de la colección que dejó la revocación de jti"""
+        raise NotImplementedError
+
+    def jtis_since(self, seq):
+        """Iterador de (jti, seq) de las revocaciones vigentes con seq mayor que seq o sin seq"""
+        raise NotImplementedError
+
+    def contains(self, jti):
+        """True si jti está revocado y todavía no expira"""
+        raise NotImplementedError
+
+    def active_jtis(self):
+        """Iterador de los jti revocados que todavía no expiran"""
+        raise NotImplementedError
+
+class Storage:
+    """Backend de almacenamiento: repositorios, contadores y estado"""
+    name = None
+
+    users = None
+    cars = None
+    car_stats = None
+    revoked_tokens = None
+
+    def ping(self):
+        """Comprobar que el backend responde (lanza una excepción si no)"""
+        raise NotImplementedError
+
+    def ensure_indexes(self, create=True):
+        """
+        Crear o solo verificar los índices que necesitan las consultas
+        
+        Returns:
+            list: nombres "coleccion.indice" que faltan
+        """
+        return []
+
+    def get_counter(self, name):
+        """Valor actual del contador (0 si no existe)"""
+        raise NotImplementedError
+
+    def increment_counter(self, name, amount=1):
+        """Sumar amount de forma atómica y devolver el nuevo valor"""
+        raise NotImplementedError
+
+    def raise_counter(self, name, value):
+        """Subir el contador hasta value si está por debajo (nunca lo baja)"""
+        raise NotImplementedError
+
+    def pool_stats(self):
+        """Estadísticas del pool de conexiones (en cero si el backend no tiene pool)"""
+        return PoolStatsListener().stats()
+
+    def after_fork(self):
+        """Rehacer en el proceso hijo lo que no puede cruzar un fork (conexiones, locks)"""
+
+    def close(self):
+        pass
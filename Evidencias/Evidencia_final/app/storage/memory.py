@@ -0,0 +1,216 @@
+import heapq
+import threading
+from datetime import datetime, timezone
+from pymongo import DESCENDING
+from app.storage.base import (Storage, UserRepository, CarRepository, CarStatsRepository, RevokedTokenRepository,
+                              public_car, stats_deltas)
+
+def matches(car, conditions):
+    """Evaluar en Python las condiciones de una CarQuery"""
+    for field, (operator, value) in conditions.items():
+        current = car[field]
+        if operator == 'eq' and current != value:
+            return False
+        if operator == 'prefix' and not (isinstance(current, str) and current.startswith(value)):
+            return False
+        if operator == 'range':
+            minimum, maximum = value
+            if (minimum is not None and current < minimum) or (maximum is not None and current > maximum):
+                return False
+    return True
+
+class MemoryUserRepository(UserRepository):
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._by_username = {}
+
+    def get_by_username(self, username):
+        user = self._by_username.get(username)
+        return dict(user) if user is not None else None
+
+    def count(self):
+        return len(self._by_username)
+
+    def insert_many(self, users):
+        with self.storage.lock:
+            for user in users:
+                if user['username'] in self._by_username:
+                    raise ValueError(f"El usuario {user['username']} ya existe")
+            for user in users:
+                self._by_username[user['username']] = dict(user)
+
+class MemoryCarRepository(CarRepository):
+    """
+    Carros en un dict por car_id, con índices hash en marca y modelo
+
+    Cada índice guarda, por valor, los car_id en un dict usado como conjunto
+    ordenado; los filtros de igualdad parten del conjunto más chico.
+    """
+    INDEXED_FIELDS = ('marca', 'modelo')
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._by_id = {}
+        self._indexes = {field: {} for field in self.INDEXED_FIELDS}
+
+    def get(self, car_id):
+        car = self._by_id.get(car_id)
+        return dict(car) if car is not None else None
+
+    def _candidates(self, conditions):
+        sets = [
+            self._indexes[field].get(value, {})
+            for field, (operator, value) in conditions.items()
+            if operator == 'eq' and field in self._indexes
+        ]
+        if not sets:
+            return list(self._by_id.values())
+        sets.sort(key=len)
+        smallest, others = sets[0], sets[1:]
+        return [self._by_id[car_id] for car_id in smallest if all(car_id in ids for ids in others)]
+
+    def find(self, query, batch_size=None):
+        with self.storage.lock:
+            cars = [car for car in self._candidates(query.conditions) if matches(car, query.conditions)]
+
+        descending = query.sort_direction == DESCENDING
+        if query.after_value is not None:
+            after = query.after_value
+            cars = [car for car in cars if (car['car_id'] < after if descending else car['car_id'] > after)]
+
+        field = query.sort_field
+        key = lambda car: (car[field], car['car_id'])
+        if query.limit_value:
+            # Solo los primeros limit, sin ordenar toda la lista
+            pick = heapq.nlargest if descending else heapq.nsmallest
+            cars = pick(query.limit_value, cars, key=key)
+        else:
+            cars = sorted(cars, key=key, reverse=descending)
+        return iter([public_car(car) for car in cars])
+
+    def _insert(self, car):
+        if car['car_id'] in self._by_id:
+            raise ValueError(f"car_id {car['car_id']} duplicado")
+        self._by_id[car['car_id']] = public_car(car)
+        for field, index in self._indexes.items():
+            index.setdefault(car[field], {})[car['car_id']] = None
+
+    def insert(self, car):
+        with self.storage.lock:
+            self._insert(car)
+
+    def insert_many(self, cars):
+        errors = {}
+        with self.storage.lock:
+            for index, car in enumerate(cars):
+                try:
+                    self._insert(car)
+                except ValueError as e:
+                    errors[index] = str(e)
+        return errors
+
+    def count(self):
+        return len(self._by_id)
+
+    def max_car_id(self):
+        return max(self._by_id, default=0)
+
+class MemoryCarStatsRepository(CarStatsRepository):
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._counts = {}
+
+    def increment(self, deltas):
+        with self.storage.lock:
+            for key, amount in deltas.items():
+                count = self._counts.get(key, 0) + amount
+                if count > 0:
+                    self._counts[key] = count
+                else:
+                    self._counts.pop(key, None)
+
+    def groups(self):
+        with self.storage.lock:
+            return iter(list(self._counts.items()))
+
+    def rebuild(self):
+        with self.storage.lock:
+            self._counts = dict(stats_deltas(self.storage.cars._by_id.values()))
+            return len(self._counts)
+
+class MemoryRevokedTokenRepository(RevokedTokenRepository):
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._expires_at = {}
+        self._seq = {}
+
+    def add(self, jti, expires_at):
+        now = datetime.now(timezone.utc)
+        with self.storage.lock:
+            # Aprovechar cada logout para olvidar los que ya expiraron
+            for expired in [key for key, value in self._expires_at.items() if value <= now]:
+                del self._expires_at[expired]
+                self._seq.pop(expired, None)
+            self._expires_at[jti] = expires_at
+            self._seq[jti] = None
+
+    def set_seq(self, jti, seq):
+        with self.storage.lock:
+            if jti in self._expires_at:
+                self._seq[jti] = seq
+
+    def contains(self, jti):
+        expires_at = self._expires_at.get(jti)
+        return expires_at is not None and expires_at > datetime.now(timezone.utc)
+
+    def active_jtis(self):
+        now = datetime.now(timezone.utc)
+        with self.storage.lock:
+            return iter([jti for jti, expires_at in self._expires_at.items() if expires_at > now])
+
+    def jtis_since(self, seq):
+        now = datetime.now(timezone.utc)
+        with self.storage.lock:
+            return iter([
+                (jti, self._seq[jti]) for jti, expires_at in self._expires_at.items()
+                if expires_at > now and (self._seq[jti] is None or self._seq[jti] > seq)
+            ])
+
+class MemoryStorage(Storage):
+    """
+    Backend en memoria, sin servidor (para pruebas y comparativas)
+
+    Los datos viven en el proceso: cada worker tiene los suyos y se pierden
+    al reiniciar.
+    """
+    name = 'memory'
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.users = MemoryUserRepository(self)
+        self.cars = MemoryCarRepository(self)
+        self.car_stats = MemoryCarStatsRepository(self)
+        self.revoked_tokens = MemoryRevokedTokenRepository(self)
+
+    def after_fork(self):
+        # El lock pudo quedar tomado por un hilo del padre que no existe en el hijo
+        self.lock = threading.Lock()
+
+    def ping(self):
+        pass
+
+    def get_counter(self, name):
+        return self.counters.get(name, 0)
+
+    def increment_counter(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+            return self.counters[name]
+
+    def raise_counter(self, name, value):
+        with self.lock:
+            self.counters[name] = max(self.counters.get(name, 0), value)
@@ -0,0 +1,307 @@
+import logging
+from datetime import datetime, timezone
+from pymongo import MongoClient, ReturnDocument, IndexModel, UpdateOne, ASCENDING, DESCENDING, TEXT
+from pymongo.errors import BulkWriteError, OperationFailure
+from app.mongo_stats import PoolStatsListener
+from app.search import search_terms
+from app.storage.base import (Storage, UserRepository, CarRepository, CarStatsRepository, RevokedTokenRepository,
+                              STATS_DIMENSIONS)
+
+logger = logging.getLogger(__name__)
+
+# Forma pública de un carro: sin ObjectId y con 'id' como alias de car_id
+CAR_PROJECTION = {'_id': 0, 'car_id': 1, 'id': '$car_id', 'marca': 1, 'modelo': 1, 'año': 1}
+
+# Índices que necesitan las consultas, por colección
+INDEXES = {
+    'users': [
+        IndexModel([('username', ASCENDING)], unique=True, name='username_unique'),
+    ],
+    'cars': [
+        IndexModel([('car_id', ASCENDING)], unique=True, name='car_id_unique'),
+        IndexModel([('marca', ASCENDING), ('modelo', ASCENDING), ('año', ASCENDING)],
+                   name='marca_modelo_año'),
+        # Respaldo de /car/search cuando el worker no tiene el índice en memoria
+        IndexModel([('marca', TEXT), ('modelo', TEXT)], name='marca_modelo_text', default_language='none'),
+    ],
+    'revoked_tokens': [
+        # TTL: MongoDB borra cada revocación cuando llega su expires_at
+        IndexModel([('expires_at', ASCENDING)], expireAfterSeconds=0, name='expires_at_ttl'),
+        IndexModel([('seq', ASCENDING)], name='seq'),
+    ],
+}
+
+def mongo_client_options(app_config):
+    """Traducir la configuración de la app a opciones de MongoClient"""
+    options = {
+        'maxPoolSize': app_config['MONGO_MAX_POOL_SIZE'],
+        'minPoolSize': app_config['MONGO_MIN_POOL_SIZE'],
+        'waitQueueTimeoutMS': app_config['MONGO_WAIT_QUEUE_TIMEOUT_MS'],
+        'serverSelectionTimeoutMS': app_config['MONGO_SERVER_SELECTION_TIMEOUT_MS'],
+        'readPreference': app_config['MONGO_READ_PREFERENCE'],
+    }
+    if app_config['MONGO_COMPRESSORS']:
+        options['compressors'] = app_config['MONGO_COMPRESSORS']
+    return options
+
+class MongoUserRepository(UserRepository):
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def get_by_username(self, username):
+        return self.storage.db.users.find_one({"username": username})
+
+    def count(self):
+        return self.storage.db.users.count_documents({})
+
+    def insert_many(self, users):
+        self.storage.db.users.insert_many(users)
+
+class MongoCarRepository(CarRepository):
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def get(self, car_id):
+        return next(self.storage.db.cars.aggregate([
+            {'$match': {'car_id': car_id}},
+            {'$limit': 1},
+            {'$project': CAR_PROJECTION}
+        ]), None)
+
+    def find(self, query, batch_size=None):
+        options = {'batchSize': int(batch_size)} if batch_size else {}
+        return self.storage.db.cars.aggregate(query.pipeline(), **options)
+
+    def insert(self, car):
+        self.storage.db.cars.insert_one(dict(car))
+
+    def insert_many(self, cars):
+        errors = {}
+        try:
+            self.storage.db.cars.insert_many([dict(car) for car in cars], ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get('writeErrors', []):
+                errors[write_error['index']] = write_error.get('errmsg', 'Error de escritura')
+        return errors
+
+    def count(self):
+        return self.storage.db.cars.count_documents({})
+
+    def search_models(self, text, limit):
+        """
+        Con el índice de texto marca_modelo_text: no distingue mayúsculas ni
+        acentos, pero compara palabras completas (un índice de texto no
+        resuelve prefijos)
+        """
+        # Cada término entre comillas: los carros deben tenerlos todos
+        terms = [term.replace('"', '') for term in search_terms(text)]
+        phrase = ' '.join(f'"{term}"' for term in terms if term)
+        if not phrase:
+            return []
+        return list(self.storage.db.cars.aggregate([
+            {'$match': {'$text': {'$search': phrase}}},
+            {'$group': {'_id': {'marca': '$marca', 'modelo': '$modelo'}, 'count': {'$sum': 1}}},
+            {'$sort': {'count': -1, '_id': 1}},
+            {'$limit': limit},
+            {'$project': {'_id': 0, 'marca': '$_id.marca', 'modelo': '$_id.modelo', 'count': 1}},
+        ]))
+
+    def migrate_legacy_ids(self):
+        """
+        Copiar 'id' a 'car_id' en los carros del esquema anterior (sembrados
+        solo con 'id'); sin esto el índice único car_id_unique no se puede construir
+        """
+        cars = self.storage.db.cars
+        updates = [
+            UpdateOne({'_id': car['_id']}, {'$set': {'car_id': car['id']}})
+            for car in cars.find({'car_id': {'$exists': False}, 'id': {'$exists': True}}, {'id': 1})
+        ]
+        if updates:
+            cars.bulk_write(updates, ordered=False)
+        return len(updates)
+
+    def max_car_id(self):
+        max_car = self.storage.db.cars.find_one({"car_id": {"$exists": True}}, sort=[("car_id", DESCENDING)])
+        return max_car["car_id"] if max_car else 0
+
+def stats_id(dimension, values):
+    """_id del documento de un grupo en car_stats: {'by': dimensión, campo: valor...}"""
+    return {'by': dimension, **dict(zip(STATS_DIMENSIONS[dimension], values))}
+
+class MongoCarStatsRepository(CarStatsRepository):
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def increment(self, deltas):
+        collection = self.storage.db.car_stats
+        collection.bulk_write([
+            UpdateOne({'_id': stats_id(dimension, values)}, {'$inc': {'count': amount}}, upsert=True)
+            for (dimension, values), amount in deltas.items()
+        ], ordered=False)
+        if any(amount < 0 for amount in deltas.values()):
+            collection.delete_many({'count': {'$lte': 0}})
+
+    def groups(self):
+        for document in self.storage.db.car_stats.find({'count': {'$gt': 0}}):
+            dimension = document['_id']['by']
+            values = tuple(document['_id'].get(field) for field in STATS_DIMENSIONS[dimension])
+            yield (dimension, values), document['count']
+
+    # Intentos de rebuild antes de aceptar un total que no cuadra con los carros
+    REBUILD_ATTEMPTS = 3
+
+    def rebuild(self):
+        """
+        Un $inc que llegue entre la agregación y el rename se pierde: después
+        del rename se compara el total con el número de carros y, si no
+        coincide, se vuelve a calcular. Conviene pausar las escrituras.
+        """
+        for attempt in range(1, self.REBUILD_ATTEMPTS + 1):
+            groups = self._rebuild_once()
+            total = sum(count for (dimension, _), count in self.groups() if dimension == 'marca')
+            cars = self.storage.db.cars.count_documents({})
+            if total == cars:
+                return groups
+            logger.warning("El resumen reconstruido no coincide con los carros (escrituras durante el rebuild)",
+                           extra={'fields': {'attempt': attempt, 'total': total, 'cars': cars}})
+        return groups
+
+    def _rebuild_once(self):
+        documents = []
+        for dimension, fields in STATS_DIMENSIONS.items():
+            for group in self.storage.db.cars.aggregate([
+                {'$group': {'_id': {field: f'${field}' for field in fields}, 'count': {'$sum': 1}}}
+            ], allowDiskUse=True):
+                values = tuple(group['_id'].get(field) for field in fields)
+                documents.append({'_id': stats_id(dimension, values), 'count': group['count']})
+
+        # Se escribe aparte y se reemplaza car_stats de una vez con rename
+        staging = self.storage.db.car_stats_rebuild
+        staging.drop()
+        if documents:
+            staging.insert_many(documents)
+            staging.rename('car_stats', dropTarget=True)
+        else:
+            self.storage.db.car_stats.drop()
+        return len(documents)
+
+class MongoRevokedTokenRepository(RevokedTokenRepository):
+    """_id es el jti; el índice TTL borra los documentos vencidos (con hasta un minuto de demora)"""
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def add(self, jti, expires_at):
+        self.storage.db.revoked_tokens.update_one({'_id': jti}, {'$set': {'expires_at': expires_at, 'seq': None}},
+                                                  upsert=True)
+
+    def set_seq(self, jti, seq):
+        self.storage.db.revoked_tokens.update_one({'_id': jti}, {'$set': {'seq': seq}})
+
+    def contains(self, jti):
+        now = datetime.now(timezone.utc)
+        return self.storage.db.revoked_tokens.find_one({'_id': jti, 'expires_at': {'$gt': now}}, {'_id': 1}) is not None
+
+    def active_jtis(self):
+        now = datetime.now(timezone.utc)
+        return (document['_id'] for document in
+                self.storage.db.revoked_tokens.find({'expires_at': {'$gt': now}}, {'_id': 1}))
+
+    def jtis_since(self, seq):
+        now = datetime.now(timezone.utc)
+        query = {'$or': [{'seq': {'$gt': seq}}, {'seq': None}], 'expires_at': {'$gt': now}}
+        return ((document['_id'], document.get('seq')) for document in
+                self.storage.db.revoked_tokens.find(query, {'_id': 1, 'seq': 1}))
+
+class MongoStorage(Storage):
+    """
+    Backend de MongoDB
+
+    Con connect=False pymongo no abre sockets ni hilos hasta la primera
+    operación, así que crear el backend no hace E/S. Un MongoClient no puede
+    cruzar un fork: after_fork crea uno nuevo en el proceso hijo.
+    """
+    name = 'mongo'
+
+    def __init__(self, uri, database_name, options=None, event_listeners=None):
+        self.uri = uri
+        self.database_name = database_name
+        self.options = options or {}
+        self.event_listeners = list(event_listeners or [])
+        self.users = MongoUserRepository(self)
+        self.cars = MongoCarRepository(self)
+        self.car_stats = MongoCarStatsRepository(self)
+        self.revoked_tokens = MongoRevokedTokenRepository(self)
+        self.connect()
+
+    def connect(self):
+        self.stats_listener = PoolStatsListener()
+        self.client = MongoClient(
+            self.uri,
+            connect=False,
+            event_listeners=[self.stats_listener] + self.event_listeners,
+            **self.options
+        )
+        self.db = self.client[self.database_name]
+
+    def after_fork(self):
+        self.connect()
+
+    def close(self):
+        self.client.close()
+
+    def ping(self):
+        self.client.admin.command('ping')
+
+    def ensure_indexes(self, create=True):
+        missing = []
+        for collection_name, indexes in INDEXES.items():
+            collection = self.db[collection_name]
+            if create:
+                for index in indexes:
+                    try:
+                        collection.create_indexes([index])
+                    except OperationFailure as e:
+                        # Error del servidor al construirlo (p. ej. E11000 por datos previos):
+                        # el índice queda en missing; los errores de conexión sí se propagan
+                        logger.warning("No se pudo crear el índice",
+                                       extra={'fields': {'index': f"{collection_name}.{index.document['name']}",
+                                                         'error': str(e)}})
+
+            existing = collection.index_information()
+            existing_keys = [
+                (list(info['key']), bool(info.get('unique', False)))
+                for info in existing.values()
+            ]
+            for index in indexes:
+                spec = index.document
+                if TEXT in spec['key'].values():
+                    # MongoDB guarda los índices de texto con la clave _fts: se comparan por nombre
+                    found = spec['name'] in existing
+                else:
+                    found = (list(spec['key'].items()), bool(spec.get('unique', False))) in existing_keys
+                if not found:
+                    missing.append(f"{collection_name}.{spec['name']}")
+        return missing
+
+    def get_counter(self, name):
+        counter = self.db.counters.find_one({"_id": name})
+        return counter["seq"] if counter else 0
+
+    def increment_counter(self, name, amount=1):
+        counter = self.db.counters.find_one_and_update(
+            {"_id": name},
+            {"$inc": {"seq": amount}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter["seq"]
+
+    def raise_counter(self, name, value):
+        self.db.counters.update_one({"_id": name}, {"$max": {"seq": value}}, upsert=True)
+
+    def pool_stats(self):
+        return self.stats_listener.stats()
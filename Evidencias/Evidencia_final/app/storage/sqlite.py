@@ -0,0 +1,342 @@
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pymongo import DESCENDING
+from app.storage.base import (Storage, UserRepository, CarRepository, CarStatsRepository, RevokedTokenRepository,
+                              public_car, STATS_DIMENSIONS)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    user_id TEXT,
+    password_hash TEXT NOT NULL,
+    role TEXT NOT NULL,
+    created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS cars (
+    car_id INTEGER PRIMARY KEY,
+    marca TEXT NOT NULL,
+    modelo TEXT NOT NULL,
+    "año" INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS car_stats (
+    dimension TEXT NOT NULL,
+    key TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (dimension, key)
+);
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL,
+    seq INTEGER
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL
+);
+"""
+
+# Índices secundarios (username y car_id ya son PRIMARY KEY): tabla -> [(nombre, columnas)]
+INDEXES = {
+    'cars': [('marca_modelo_año', 'marca, modelo, "año"')],
+    'revoked_tokens': [('revoked_tokens_expires_at', 'expires_at'), ('revoked_tokens_seq', 'seq')],
+}
+
+CAR_COLUMNS = {'car_id': 'car_id', 'marca': 'marca', 'modelo': 'modelo', 'año': '"año"'}
+CAR_SELECT = 'SELECT car_id, marca, modelo, "año" FROM cars'
+
+_memory_ids = itertools.count(1)
+
+def glob_prefix(value):
+    """Patrón GLOB (sensible a mayúsculas, como el regex de Mongo) para un prefijo literal"""
+    escaped = ''.join(f'[{char}]' if char in '*?[' else char for char in value)
+    return escaped + '*'
+
+def stats_key(values):
+    """Valores de un grupo del resumen como texto (columna key de car_stats)"""
+    return json.dumps(list(values), ensure_ascii=False)
+
+def car_from_row(row):
+    return public_car({'car_id': row[0], 'marca': row[1], 'modelo': row[2], 'año': row[3]})
+
+class SQLiteUserRepository(UserRepository):
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def get_by_username(self, username):
+        row = self.storage.connection().execute(
+            'SELECT username, user_id, password_hash, role, created_at FROM users WHERE username = ?',
+            (username,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'username': row[0], 'user_id': row[1], 'password_hash': row[2], 'role': row[3],
+                'created_at': row[4]}
+
+    def count(self):
+        return self.storage.connection().execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+    def insert_many(self, users):
+        connection = self.storage.connection()
+        with connection:
+            connection.executemany(
+                'INSERT INTO users (username, user_id, password_hash, role, created_at) VALUES (?, ?, ?, ?, ?)',
+                [
+                    (user['username'], user.get('user_id'), user['password_hash'], user['role'],
+                     user['created_at'].isoformat() if isinstance(user.get('created_at'), datetime)
+                     else user.get('created_at'))
+                    for user in users
+                ]
+            )
+
+class SQLiteCarRepository(CarRepository):
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def get(self, car_id):
+        row = self.storage.connection().execute(f'{CAR_SELECT} WHERE car_id = ?', (car_id,)).fetchone()
+        return car_from_row(row) if row is not None else None
+
+    def compile(self, query):
+        """Traducir una CarQuery a SQL con parámetros"""
+        where, params = [], []
+        for field, (operator, value) in query.conditions.items():
+            column = CAR_COLUMNS[field]
+            if operator == 'eq':
+                where.append(f'{column} = ?')
+                params.append(value)
+            elif operator == 'prefix':
+                where.append(f'{column} GLOB ?')
+                params.append(glob_prefix(value))
+            else:
+                minimum, maximum = value
+                if minimum is not None:
+                    where.append(f'{column} >= ?')
+                    params.append(minimum)
+                if maximum is not None:
+                    where.append(f'{column} <= ?')
+                    params.append(maximum)
+
+        direction = 'DESC' if query.sort_direction == DESCENDING else 'ASC'
+        if query.after_value is not None:
+            where.append('car_id < ?' if direction == 'DESC' else 'car_id > ?')
+            params.append(query.after_value)
+
+        sql = CAR_SELECT
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        order = [f'{CAR_COLUMNS[query.sort_field]} {direction}']
+        if query.sort_field != 'car_id':
+            order.append(f'car_id {direction}')  # desempate estable
+        sql += ' ORDER BY ' + ', '.join(order)
+        if query.limit_value:
+            sql += ' LIMIT ?'
+            params.append(query.limit_value)
+        return sql, params
+
+    def find(self, query, batch_size=None):
+        sql, params = self.compile(query)
+        cursor = self.storage.connection().execute(sql, params)
+        if batch_size:
+            cursor.arraysize = int(batch_size)
+        return map(car_from_row, cursor)
+
+    def insert(self, car):
+        connection = self.storage.connection()
+        with connection:
+            connection.execute('INSERT INTO cars (car_id, marca, modelo, "año") VALUES (?, ?, ?, ?)',
+                               (car['car_id'], car['marca'], car['modelo'], car['año']))
+
+    def insert_many(self, cars):
+        errors = {}
+        connection = self.storage.connection()
+        with connection:
+            for index, car in enumerate(cars):
+                try:
+                    connection.execute('INSERT INTO cars (car_id, marca, modelo, "año") VALUES (?, ?, ?, ?)',
+                                       (car['car_id'], car['marca'], car['modelo'], car['año']))
+                except sqlite3.IntegrityError as e:
+                    errors[index] = str(e)
+        return errors
+
+    def count(self):
+        return self.storage.connection().execute('SELECT COUNT(*) FROM cars').fetchone()[0]
+
+    def max_car_id(self):
+        return self.storage.connection().execute('SELECT COALESCE(MAX(car_id), 0) FROM cars').fetchone()[0]
+
+class SQLiteCarStatsRepository(CarStatsRepository):
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def increment(self, deltas):
+        connection = self.storage.connection()
+        with connection:
+            connection.executemany(
+                'INSERT INTO car_stats (dimension, key, count) VALUES (?, ?, ?) '
+                'ON CONFLICT(dimension, key) DO UPDATE SET count = count + excluded.count',
+                [(dimension, stats_key(values), amount) for (dimension, values), amount in deltas.items()]
+            )
+            if any(amount < 0 for amount in deltas.values()):
+                connection.execute('DELETE FROM car_stats WHERE count <= 0')
+
+    def groups(self):
+        cursor = self.storage.connection().execute('SELECT dimension, key, count FROM car_stats WHERE count > 0')
+        return (((dimension, tuple(json.loads(key))), count) for dimension, key, count in cursor)
+
+    def rebuild(self):
+        connection = self.storage.connection()
+        rows = []
+        with connection:
+            # En una transacción: nadie ve el resumen vacío ni a medio calcular
+            connection.execute('DELETE FROM car_stats')
+            for dimension, fields in STATS_DIMENSIONS.items():
+                columns = ', '.join(CAR_COLUMNS[field] for field in fields)
+                for row in connection.execute(f'SELECT {columns}, COUNT(*) FROM cars GROUP BY {columns}'):
+                    rows.append((dimension, stats_key(row[:-1]), row[-1]))
+            connection.executemany('INSERT INTO car_stats (dimension, key, count) VALUES (?, ?, ?)', rows)
+        return len(rows)
+
+class SQLiteRevokedTokenRepository(RevokedTokenRepository):
+    """expires_at se guarda como timestamp Unix"""
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def add(self, jti, expires_at):
+        connection = self.storage.connection()
+        with connection:
+            # Aprovechar cada logout para borrar los que ya expiraron
+            connection.execute('DELETE FROM revoked_tokens WHERE expires_at <= ?', (time.time(),))
+            connection.execute('INSERT OR REPLACE INTO revoked_tokens (jti, expires_at) VALUES (?, ?)',
+                               (jti, expires_at.timestamp()))
+
+    def set_seq(self, jti, seq):
+        connection = self.storage.connection()
+        with connection:
+            connection.execute('UPDATE revoked_tokens SET seq = ? WHERE jti = ?', (seq, jti))
+
+    def contains(self, jti):
+        return self.storage.connection().execute(
+            'SELECT 1 FROM revoked_tokens WHERE jti = ? AND expires_at > ?', (jti, time.time())
+        ).fetchone() is not None
+
+    def active_jtis(self):
+        cursor = self.storage.connection().execute('SELECT jti FROM revoked_tokens WHERE expires_at > ?',
+                                                   (time.time(),))
+        return (row[0] for row in cursor)
+
+    def jtis_since(self, seq):
+        cursor = self.storage.connection().execute(
+            'SELECT jti, seq FROM revoked_tokens WHERE (seq > ? OR seq IS NULL) AND expires_at > ?',
+            (seq, time.time())
+        )
+        return ((row[0], row[1]) for row in cursor)
+
+class SQLiteStorage(Storage):
+    """
+    Backend de SQLite (un archivo, sin servidor)
+
+    Cada hilo usa su propia conexión. Con path=':memory:' la base es
+    compartida entre los hilos del proceso y se pierde al terminar.
+    """
+    name = 'sqlite'
+
+    def __init__(self, path):
+        self.path = path
+        self.users = SQLiteUserRepository(self)
+        self.cars = SQLiteCarRepository(self)
+        self.car_stats = SQLiteCarStatsRepository(self)
+        self.revoked_tokens = SQLiteRevokedTokenRepository(self)
+        self._local = threading.local()
+        self._keeper = None
+        if path == ':memory:':
+            # Una conexión abierta mantiene viva la base en memoria compartida
+            self.target = f'file:evidencia-{os.getpid()}-{next(_memory_ids)}?mode=memory&cache=shared'
+            self._keeper = self._open()
+        else:
+            self.target = f'file:{path}'
+        self.connection().executescript(SCHEMA)
+        self._add_missing_columns()
+
+    def _add_missing_columns(self):
+        """Columnas agregadas después de crear la tabla en bases existentes"""
+        connection = self.connection()
+        columns = {row[1] for row in connection.execute('PRAGMA table_info(revoked_tokens)')}
+        if 'seq' not in columns:
+            with connection:
+                connection.execute('ALTER TABLE revoked_tokens ADD COLUMN seq INTEGER')
+
+    def _open(self):
+        connection = sqlite3.connect(self.target, uri=True, check_same_thread=False)
+        if self.path != ':memory:':
+            # WAL: las lecturas no esperan a las escrituras de otros hilos o procesos
+            connection.execute('PRAGMA journal_mode=WAL')
+        return connection
+
+    def connection(self):
+        """Conexión del hilo actual (se abre la primera vez)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._open()
+        return connection
+
+    def after_fork(self):
+        # Las conexiones de SQLite no se pueden usar después de un fork
+        self._local = threading.local()
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def ping(self):
+        self.connection().execute('SELECT 1').fetchone()
+
+    def ensure_indexes(self, create=True):
+        connection = self.connection()
+        if create:
+            with connection:
+                for table, indexes in INDEXES.items():
+                    for name, columns in indexes:
+                        connection.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON {table} ({columns})')
+
+        existing = {
+            row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+        }
+        return [
+            f'{table}.{name}'
+            for table, indexes in INDEXES.items()
+            for name, _ in indexes
+            if name not in existing
+        ]
+
+    def get_counter(self, name):
+        row = self.connection().execute('SELECT seq FROM counters WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else 0
+
+    def increment_counter(self, name, amount=1):
+        connection = self.connection()
+        with connection:
+            return connection.execute(
+                'INSERT INTO counters (name, seq) VALUES (?, ?) '
+                'ON CONFLICT(name) DO UPDATE SET seq = seq + excluded.seq RETURNING seq',
+                (name, amount)
+            ).fetchone()[0]
+
+    def raise_counter(self, name, value):
+        connection = self.connection()
+        with connection:
+            connection.execute(
+                'INSERT INTO counters (name, seq) VALUES (?, ?) '
+                'ON CONFLICT(name) DO UPDATE SET seq = MAX(seq, excluded.seq)',
+                (name, value)
+            )
@@ -1,6 +1,10 @@
+import logging
 from functools import wraps
-from flask import jsonify
-from flask_jwt_extended import jwt_required, get_jwt
+from flask import jsonify, request, current_app
+from flask_jwt_extended import jwt_required, get_jwt, verify_jwt_in_request
+from app.compression import ENCODERS, encoded_etag
+
+logger = logging.getLogger(__name__)
 
 def get_current_user_role():
     """
@@ -12,18 +16,71 @@ def get_current_user_role():
     except:
         return None
 
+def role_error(admin=False):
+    """
+    Validar el rol del JWT ya verificado en la petición actual
+    
+    Returns:
+        La respuesta 403 si el rol no alcanza, o None si puede continuar
+    """
+    current_role = get_current_user_role()
+    
+    if admin and current_role != 'admin':
+        return jsonify({
+            'error': 'Acceso denegado',
+            'message': 'Solo los administradores pueden acceder a este endpoint'
+        }), 403
+    
+    if current_role is None:
+        return jsonify({
+            'error': 'Permisos insuficientes',
+            'message': f'Se requiere autenticación válida. Tu rol: {current_role}'
+        }), 403
+    
+    return None
+
+def check_role(admin=False):
+    """
+    Equivalente a role_required/admin_required para vistas que no pueden
+    usar los decoradores (p. ej. las vistas async del modo ASGI)
+    
+    Los errores del JWT se lanzan igual que con jwt_required()
+    """
+    verify_jwt_in_request()
+    return role_error(admin)
+
+def collection_etag(collection_name, version):
+    """ETag fuerte de las respuestas que dependen de toda la colección"""
+    return f'{collection_name}-{version}'
+
+def add_cache_headers(response, etag):
+    """Agregar ETag y Cache-Control (CARS_CACHE_CONTROL) a la respuesta"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = current_app.config['CARS_CACHE_CONTROL']
+    return response
+
+def not_modified(etag):
+    """
+    Respuesta 304 si el If-None-Match del cliente ya tiene este ETag
+    
+    Returns:
+        La respuesta 304 o None si hay que generar el cuerpo
+    """
+    # El cliente puede tener la versión comprimida, con el ETag de su codificación
+    for candidate in [etag] + [encoded_etag(etag, encoding) for encoding in ENCODERS]:
+        if request.if_none_match.contains_weak(candidate):
+            return add_cache_headers(current_app.response_class(status=304), candidate)
+    return None
+
 def role_required(f):
     """Decorator que requiere autenticación JWT válida"""
     @wraps(f)
     @jwt_required()
     def decorated_fn(*args, **kwargs):
-        current_role = get_current_user_role()
-        print(current_role)
-        if current_role is None:
-            return jsonify({
-                'error': 'Permisos insuficientes',
-                'message': f'Se requiere autenticación válida. Tu rol: {current_role}'
-            }), 403
+        logger.debug("Petición autenticada", extra={'fields': {'role': get_current_user_role()}})
+        error = role_error()
+        if error:
+            return error
         return f(*args, **kwargs)
     return decorated_fn
 
@@ -34,13 +91,9 @@ def admin_required(f):
     @wraps(f)
     @jwt_required()
     def decorated_function(*args, **kwargs):
-        current_role = get_current_user_role()
-        
-        if current_role != 'admin':
-            return jsonify({
-                'error': 'Acceso denegado',
-                'message': 'Solo los administradores pueden acceder a este endpoint'
-            }), 403
+        error = role_error(admin=True)
+        if error:
+            return error
         
         return f(*args, **kwargs)
-    return decorated_function
\ No newline at end of file
+    return decorated_function
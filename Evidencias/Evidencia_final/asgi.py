@@ -0,0 +1,6 @@
+import os
+from app.asgi import create_asgi_app
+
+config_name = os.getenv('FLASK_CONFIG', 'development')
+
+app = create_asgi_app(config_name)
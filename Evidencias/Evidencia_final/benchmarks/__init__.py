@@ -0,0 +1,12 @@
+"""
+Benchmarks de la API de Evidencia_final
+
+Levanta create_app('testing') en el mismo proceso (contra un mongod local o
+contra mongomock con --fake) y mide las rutas principales con varios niveles
+de concurrencia; con --backends se comparan los backends de almacenamiento.
+Uso, desde Evidencia_final:
+
+    python -m benchmarks --fake
+    python -m benchmarks --fake --backends mongo,memory,sqlite
+    python -m benchmarks --fake --backends mongo,memory,sqlite --update-baseline
+"""
@@ -0,0 +1,294 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, 'baseline.json')
+
+BACKENDS = ('mongo', 'memory', 'sqlite')
+DEFAULT_CONCURRENCY = '1,8,32'
+DEFAULT_REQUESTS = 300
+# El login verifica un hash de contraseña lento a propósito: menos peticiones
+DEFAULT_LOGIN_REQUESTS = 30
+# Variación permitida respecto a la línea base antes de marcar una regresión
+DEFAULT_TOLERANCE = 0.25
+
+# ========== ESCENARIOS ==========
+# Cada escenario recibe el cliente de pruebas, los headers con el token y el
+# número de la petición, y devuelve la respuesta.
+
+# Refresh token del login inicial (get_token_headers)
+tokens = {}
+
+def login(client, headers, i):
+    return client.post('/auth/login', json={'username': 'admin1', 'password': 'admin123'})
+
+def refresh(client, headers, i):
+    # El mismo resultado que un login, sin verificar la contraseña
+    return client.post('/auth/refresh', headers={'Authorization': f"Bearer {tokens['refresh']}"})
+
+def list_cars(client, headers, i):
+    return client.get('/car?limit=100', headers=headers)
+
+def get_car(client, headers, i):
+    # Recorrer los carros sembrados por `flask seed` (car_id 1..5)
+    return client.get(f'/car/{i % 5 + 1}/', headers=headers)
+
+def post_car(client, headers, i):
+    return client.post('/car', headers=headers, json={
+        'name': f'bench-{i}', 'marca': 'Bench', 'modelo': f'M{i % 50}', 'año': 2000 + i % 25
+    })
+
+SCENARIOS = {
+    'login': (login, 200),
+    'refresh': (refresh, 200),
+    'list_cars': (list_cars, 200),
+    'get_car': (get_car, 200),
+    'post_car': (post_car, 201),
+}
+
+# ========== APP ==========
+
+def use_fake_mongo():
+    """Reemplazar MongoClient por mongomock (base de datos en memoria)"""
+    try:
+        import mongomock
+    except ImportError:
+        raise SystemExit("--fake requiere mongomock (pip install mongomock)")
+    from app.storage import mongo
+    mongo.MongoClient = mongomock.MongoClient
+
+def backend_label(backend, fake):
+    if backend == 'mongo':
+        return 'mongomock' if fake else 'mongod'
+    return backend
+
+def benchmark_config(backend):
+    """Registrar una configuración 'testing' con el backend pedido"""
+    from config import config, TestingConfig
+    name = f'benchmark-{backend}'
+    config[name] = type(name, (TestingConfig,), {
+        'STORAGE_BACKEND': backend,
+        'SQLITE_PATH': os.path.join(tempfile.mkdtemp(prefix='benchmark-'), 'benchmark.sqlite3'),
+        # Sin chequeos en segundo plano: la siembra ya verifica la conexión
+        'MONGO_STARTUP_CHECK': False,
+        'HEALTH_PROBE_ENABLED': False,
+    })
+    return name
+
+def build_app(backend, fake):
+    os.environ.setdefault('JWT_SECRET_KEY', 'benchmark-secret-key-de-al-menos-32-bytes')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ.setdefault('MONGO_URI', 'mongodb://localhost:27017')
+    if fake and backend == 'mongo':
+        use_fake_mongo()
+
+    from app import create_app
+    app = create_app(benchmark_config(backend))
+    result = app.test_cli_runner().invoke(args=['seed'])
+    if result.exit_code != 0:
+        raise SystemExit(f"No se pudo sembrar la base de datos: {result.output}")
+    return app
+
+def get_token_headers(app):
+    response = app.test_client().post('/auth/login', json={'username': 'admin1', 'password': 'admin123'})
+    if response.status_code != 200:
+        raise SystemExit(f"No se pudo iniciar sesión para el benchmark: {response.status_code}")
+    tokens['refresh'] = response.json['refresh_token']
+    return {'Authorization': f"Bearer {response.json['access_token']}"}
+
+# ========== MEDICIÓN ==========
+
+def percentile(sorted_values, fraction):
+    """Percentil por el método del rango más cercano"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def run_scenario(app, headers, backend, name, concurrency, total_requests):
+    """Lanzar total_requests peticiones con `concurrency` hilos y resumir las latencias"""
+    view, expected_status = SCENARIOS[name]
+    counter = itertools.count()
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker():
+        client = app.test_client()
+        local_latencies = []
+        local_errors = 0
+        while True:
+            i = next(counter)
+            if i >= total_requests:
+                break
+            started = time.perf_counter()
+            response = view(client, headers, i)
+            local_latencies.append(time.perf_counter() - started)
+            if response.status_code != expected_status:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors.append(local_errors)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'backend': backend,
+        'scenario': name,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+def parameter_mismatches(report, baseline):
+    """
+    Parámetros de la corrida que no coinciden con los de la línea base
+    
+    Con otra cantidad de peticiones (o niveles de concurrencia que la línea
+    base no midió) las latencias no son comparables.
+    """
+    mismatches = []
+    for key in ('requests_per_level', 'login_requests_per_level'):
+        if key in baseline and baseline[key] != report[key]:
+            mismatches.append(f"{key}: {report[key]} (línea base {baseline[key]})")
+    baseline_levels = baseline.get('concurrency_levels') or sorted(
+        {r['concurrency'] for r in baseline.get('results', [])})
+    unmeasured = [level for level in report['concurrency_levels'] if level not in baseline_levels]
+    if unmeasured:
+        mismatches.append(f"concurrency_levels: {report['concurrency_levels']} (línea base {baseline_levels})")
+    return mismatches
+
+def compare(results, baseline, tolerance):
+    """Lista de regresiones: p95 más alto o rps más bajo que la línea base más la tolerancia"""
+    previous = {
+        (r.get('backend', baseline.get('backend')), r['scenario'], r['concurrency']): r
+        for r in baseline.get('results', [])
+    }
+    regressions = []
+    for result in results:
+        base = previous.get((result['backend'], result['scenario'], result['concurrency']))
+        if base is None:
+            continue
+        key = f"{result['backend']} {result['scenario']} c={result['concurrency']}"
+        if result['errors'] > base.get('errors', 0):
+            regressions.append(f"{key}: {result['errors']} errores (línea base {base.get('errors', 0)})")
+        if base['p95_ms'] and result['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{key}: p95 {result['p95_ms']} ms (línea base {base['p95_ms']} ms)")
+        if base['rps'] and result['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append(f"{key}: {result['rps']} req/s (línea base {base['rps']} req/s)")
+    return regressions
+
+def print_table(results):
+    print(f"{'backend':<10} {'escenario':<10} {'conc':>5} {'req':>6} {'err':>4} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for r in results:
+        print(f"{r['backend']:<10} {r['scenario']:<10} {r['concurrency']:>5} {r['requests']:>6} {r['errors']:>4} "
+              f"{r['rps']:>9} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Benchmarks de la API')
+    parser.add_argument('--backends', default='mongo',
+                        help=f"backends de almacenamiento a comparar ({', '.join(BACKENDS)})")
+    parser.add_argument('--fake', action='store_true',
+                        help='backend mongo: usar mongomock en lugar del mongod de MONGO_URI')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"escenarios separados por coma ({', '.join(SCENARIOS)})")
+    parser.add_argument('--concurrency', default=DEFAULT_CONCURRENCY,
+                        help='niveles de concurrencia separados por coma')
+    parser.add_argument('--requests', type=int, default=DEFAULT_REQUESTS,
+                        help='peticiones por escenario y nivel de concurrencia')
+    parser.add_argument('--login-requests', type=int, default=DEFAULT_LOGIN_REQUESTS,
+                        help='peticiones por nivel de concurrencia para login')
+    parser.add_argument('--output', default='benchmark-results.json',
+                        help='archivo JSON con los resultados')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='línea base para comparar')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='variación permitida (0.25 = 25%%)')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='guardar los resultados como nueva línea base')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Escenarios desconocidos: {', '.join(unknown)}")
+    levels = [int(level) for level in args.concurrency.split(',')]
+    backends = [name.strip() for name in args.backends.split(',') if name.strip()]
+    unknown = [name for name in backends if name not in BACKENDS]
+    if unknown:
+        raise SystemExit(f"Backends desconocidos: {', '.join(unknown)}")
+
+    results = []
+    for backend in backends:
+        app = build_app(backend, args.fake)
+        headers = get_token_headers(app)
+        label = backend_label(backend, args.fake)
+        for name in scenarios:
+            for concurrency in levels:
+                total = args.login_requests if name == 'login' else args.requests
+                results.append(run_scenario(app, headers, label, name, concurrency, total))
+    print_table(results)
+
+    report = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'backends': [backend_label(backend, args.fake) for backend in backends],
+        'python': platform.python_version(),
+        'requests_per_level': args.requests,
+        'login_requests_per_level': args.login_requests,
+        'concurrency_levels': levels,
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"📄 Resultados en {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"📌 Línea base actualizada en {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("⚠️  No hay línea base; use --update-baseline para crearla")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    measured = {r.get('backend', baseline.get('backend')) for r in baseline.get('results', [])}
+    missing = [label for label in report['backends'] if label not in measured]
+    if missing:
+        print(f"⚠️  La línea base no tiene resultados de: {', '.join(missing)}")
+
+    mismatches = parameter_mismatches(report, baseline)
+    if mismatches:
+        print("❌ Los parámetros no coinciden con los de la línea base; no se compara:")
+        for mismatch in mismatches:
+            print(f"   - {mismatch}")
+        return 1
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("❌ Regresiones de rendimiento:")
+        for regression in regressions:
+            print(f"   - {regression}")
+        return 1
+    print("✅ Sin regresiones respecto a la línea base")
+    return 0
@@ -9,10 +9,93 @@ class Config:
     # JWT Configuration
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
+    # Refresh token del login: renueva el access token en /auth/refresh sin volver a verificar la contraseña
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(hours=float(os.getenv('JWT_REFRESH_TOKEN_EXPIRES_HOURS', 24 * 7)))
+    # Filtro de Bloom de tokens revocados (/auth/logout): revocaciones vigentes
+    # esperadas por worker y tasa de falsos positivos (que consultan la base)
+    JWT_BLOCKLIST_CAPACITY = int(os.getenv('JWT_BLOCKLIST_CAPACITY', 100000))
+    JWT_BLOCKLIST_FALSE_POSITIVE_RATE = float(os.getenv('JWT_BLOCKLIST_FALSE_POSITIVE_RATE', 0.001))
+    # Segundos que cada proceso reutiliza la versión de la lista de revocados:
+    # un token revocado en otro worker puede seguir aceptándose hasta ese tiempo
+    JWT_BLOCKLIST_VERSION_TTL = float(os.getenv('JWT_BLOCKLIST_VERSION_TTL', 1))
+    
+    # Verificación de contraseñas en un pool de procesos (0 = en el hilo de la petición)
+    AUTH_HASH_WORKERS = int(os.getenv('AUTH_HASH_WORKERS', 2))
+    # Inicios de sesión simultáneos antes de responder 503
+    AUTH_HASH_MAX_PENDING = int(os.getenv('AUTH_HASH_MAX_PENDING', 8))
+    AUTH_HASH_TIMEOUT = float(os.getenv('AUTH_HASH_TIMEOUT', 5))
+    
+    # Proveedor JSON de las respuestas: 'orjson' (rápido) o 'default'
+    JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'orjson')
+    
+    # Logging: nivel, fracción de registros que se escriben por nivel y campos ocultos
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_SAMPLE_RATES = os.getenv('LOG_SAMPLE_RATES', 'DEBUG=0.1')
+    LOG_REDACT_FIELDS = os.getenv('LOG_REDACT_FIELDS', 'password,password_hash,access_token,refresh_token,authorization')
+    
+    # Métricas en GET /metrics
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    
+    # Almacenamiento: 'mongo', 'memory' (sin servidor, datos por proceso) o 'sqlite'
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'mongo')
+    SQLITE_PATH = os.getenv('SQLITE_PATH', 'evidencia.sqlite3')
     
     # MongoDB Configuration
     MONGO_URI = os.getenv('MONGO_URI')
     DATABASE_NAME = os.getenv('DATABASE_NAME')
+    # Crear los índices al arrancar (si es False solo se verifican)
+    MONGO_CREATE_INDEXES = os.getenv('MONGO_CREATE_INDEXES', 'True').lower() == 'true'
+    # Hacer ping y verificar índices en segundo plano al crear la app
+    MONGO_STARTUP_CHECK = os.getenv('MONGO_STARTUP_CHECK', 'True').lower() == 'true'
+    # Pool de conexiones y red
+    MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 100))
+    MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 0))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2000))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+    # Compresión del protocolo en orden de preferencia (zstd y snappy requieren
+    # zstandard / python-snappy; zlib viene con Python). Vacío = sin compresión
+    MONGO_COMPRESSORS = os.getenv('MONGO_COMPRESSORS', 'zlib')
+    MONGO_READ_PREFERENCE = os.getenv('MONGO_READ_PREFERENCE', 'primary')
+    
+    # Ping a MongoDB en segundo plano para /readyz y /welcome (segundos)
+    HEALTH_PROBE_ENABLED = os.getenv('HEALTH_PROBE_ENABLED', 'True').lower() == 'true'
+    HEALTH_PROBE_INTERVAL = float(os.getenv('HEALTH_PROBE_INTERVAL', 5))
+    
+    # Paginación del listado de carros
+    CARS_PAGE_SIZE = int(os.getenv('CARS_PAGE_SIZE', 100))
+    CARS_MAX_PAGE_SIZE = int(os.getenv('CARS_MAX_PAGE_SIZE', 1000))
+    CARS_STREAM_BATCH_SIZE = int(os.getenv('CARS_STREAM_BATCH_SIZE', 500))
+    
+    # Exportación del catálogo: carros por lote leído del cursor (y por row group en Parquet)
+    CARS_EXPORT_BATCH_SIZE = int(os.getenv('CARS_EXPORT_BATCH_SIZE', 5000))
+    
+    # /car/search: resultados por defecto y pares marca/modelo que cada worker
+    # guarda en memoria (con más, o con 0, se busca en la base de datos)
+    CARS_SEARCH_LIMIT = int(os.getenv('CARS_SEARCH_LIMIT', 10))
+    CARS_SEARCH_MAX_LIMIT = int(os.getenv('CARS_SEARCH_MAX_LIMIT', 50))
+    CARS_SEARCH_INDEX_MAX_ENTRIES = int(os.getenv('CARS_SEARCH_INDEX_MAX_ENTRIES', 100000))
+    
+    # Cantidad de car_id que cada proceso reserva de una vez en la colección counters
+    CAR_ID_BLOCK_SIZE = int(os.getenv('CAR_ID_BLOCK_SIZE', 20))
+    
+    # Carga masiva: carros por cada insert_many
+    CAR_BULK_CHUNK_SIZE = int(os.getenv('CAR_BULK_CHUNK_SIZE', 1000))
+    
+    # Caché de carros por ID (CAR_CACHE_SIZE=0 la deshabilita, TTL en segundos)
+    CAR_CACHE_SIZE = int(os.getenv('CAR_CACHE_SIZE', 1024))
+    CAR_CACHE_TTL = int(os.getenv('CAR_CACHE_TTL', 30))
+    
+    # Compresión de respuestas según Accept-Encoding (br y zstd requieren
+    # brotli / zstandard). Niveles por algoritmo y tamaño mínimo en bytes
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True').lower() == 'true'
+    COMPRESSION_ALGORITHMS = os.getenv('COMPRESSION_ALGORITHMS', 'zstd,br,gzip')
+    COMPRESSION_LEVELS = os.getenv('COMPRESSION_LEVELS', 'gzip=6,br=4,zstd=3')
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+    
+    # Peticiones condicionales (ETag) de GET /car: segundos que cada proceso
+    # reutiliza la versión de la colección y Cache-Control de las respuestas
+    CARS_VERSION_TTL = float(os.getenv('CARS_VERSION_TTL', 1))
+    CARS_CACHE_CONTROL = os.getenv('CARS_CACHE_CONTROL', 'private, no-cache')
     
     # Server Configuration
     HOST = os.getenv('HOST')
@@ -26,14 +109,23 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     """Configuración para producción"""
     DEBUG = False
+    # En producción los índices se gestionan aparte; solo se verifican al arrancar
+    MONGO_CREATE_INDEXES = os.getenv('MONGO_CREATE_INDEXES', 'False').lower() == 'true'
     # En producción, estas deberían venir de variables de entorno
     SECRET_KEY = os.getenv('SECRET_KEY', Config.SECRET_KEY)
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', Config.JWT_SECRET_KEY)
+    CAR_CACHE_SIZE = int(os.getenv('CAR_CACHE_SIZE', 10000))
+    CAR_CACHE_TTL = int(os.getenv('CAR_CACHE_TTL', 300))
 
 class TestingConfig(Config):
     """Configuración para testing"""
     TESTING = True
     DATABASE_NAME = 'flask_app_test'
+    # La API completa sin servidor de MongoDB
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'memory')
+    # Sin caché para que las pruebas vean siempre la base de datos
+    CAR_CACHE_SIZE = 0
+    AUTH_HASH_WORKERS = 0
 
 # Diccionario de configuraciones
 config = {